@@ -13,6 +13,7 @@ from services.scheduler import task_scheduler
 from config import Config
 import logging
 import os
+from utils.json_codec import CodecJSONProvider
 from utils.mongodb_index_manager import init_mongodb_indexes
 from models.database import db_instance
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -30,6 +31,7 @@ logger = logging.getLogger(__name__)
 def create_app():
     """Create Flask application"""
     app = Flask(__name__, static_folder="static", static_url_path="")
+    app.json = CodecJSONProvider(app)
 
     # Configure proxy settings
     app.wsgi_app = ProxyFix(
@@ -16,6 +16,20 @@ class Config:
     
     # AES encryption configuration
     ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', 'your-32-byte-encryption-key-here!')
+    # Comma separated keys still accepted for decryption while data is rotated to ENCRYPTION_KEY
+    ENCRYPTION_PREVIOUS_KEYS = os.getenv('ENCRYPTION_PREVIOUS_KEYS', '')
+    # Derived per-salt keys kept in memory (least recently used are evicted, 0 disables)
+    ENCRYPTION_KEY_CACHE_SIZE = int(os.getenv('ENCRYPTION_KEY_CACHE_SIZE', '10000'))
+    # Lock process memory so derived keys are never swapped out, needs a raised memlock limit or CAP_IPC_LOCK
+    ENCRYPTION_MLOCK = os.getenv('ENCRYPTION_MLOCK', 'False').lower() == 'true'
+    # Processes deriving legacy keys in parallel for whole batches of credentials (0 = one per CPU core)
+    ENCRYPTION_KDF_WORKERS = int(os.getenv('ENCRYPTION_KDF_WORKERS', '0'))
+    # Ciphertext format for new data: 2 (AES-GCM, key derived once) or 1 (legacy PBKDF2 + Fernet, for rolling deploys)
+    ENCRYPTION_WRITE_VERSION = int(os.getenv('ENCRYPTION_WRITE_VERSION', '2'))
+    # Re-encrypt stored IRCC passwords in the current format, in batches throttled to ops per second
+    ENCRYPTION_MIGRATE_ON_START = os.getenv('ENCRYPTION_MIGRATE_ON_START', 'False').lower() == 'true'
+    ENCRYPTION_MIGRATION_BATCH_SIZE = int(os.getenv('ENCRYPTION_MIGRATION_BATCH_SIZE', '200'))
+    ENCRYPTION_MIGRATION_OPS_PER_SECOND = float(os.getenv('ENCRYPTION_MIGRATION_OPS_PER_SECOND', '200'))
     
     # Email configuration
     SMTP_SERVER = os.getenv('SMTP_SERVER', '')
@@ -26,7 +40,76 @@ class Config:
     
     # Scheduled task configuration
     CHECK_INTERVAL_MINUTES = int(os.getenv('CHECK_INTERVAL_MINUTES', '10'))
+    CHECK_POLL_SECONDS = int(os.getenv('CHECK_POLL_SECONDS', '15'))  # How often due credentials are dispatched
+    CHECK_JITTER_RATIO = float(os.getenv('CHECK_JITTER_RATIO', '0.1'))  # Spread of next check times around the interval
+    # Adaptive cadence: idle applications are checked every idle_time * ratio, between the interval and the ceiling
+    CHECK_MAX_INTERVAL_MINUTES = int(os.getenv('CHECK_MAX_INTERVAL_MINUTES', '360'))
+    CHECK_IDLE_BACKOFF_RATIO = float(os.getenv('CHECK_IDLE_BACKOFF_RATIO', '0.05'))
+    # Per application type overrides, e.g. "citizen=10:240,immigrant=30:720:0.1" (min:max[:ratio] minutes)
+    CHECK_CADENCE_OVERRIDES = os.getenv('CHECK_CADENCE_OVERRIDES', '')
+    CHECK_CONCURRENCY = int(os.getenv('CHECK_CONCURRENCY', '8'))
+    CHECK_MODE = os.getenv('CHECK_MODE', 'threads').lower()  # 'threads' or 'async'
+    CHECK_ASYNC_CONCURRENCY = int(os.getenv('CHECK_ASYNC_CONCURRENCY', '500'))
+    CHECK_BATCH_SIZE = int(os.getenv('CHECK_BATCH_SIZE', '500'))  # Credentials fetched per cursor batch
+    CHECK_LEASE_SECONDS = int(os.getenv('CHECK_LEASE_SECONDS', '600'))  # Claimed credentials return to the pool after this
+    CHECK_RUN_STALE_SECONDS = int(os.getenv('CHECK_RUN_STALE_SECONDS', '300'))  # Full check runs without progress for this long are resumed
+    # Only one web process runs the scheduler; another takes over when the leader stops heartbeating
+    SCHEDULER_LEADER_ELECTION = os.getenv('SCHEDULER_LEADER_ELECTION', 'True').lower() == 'true'
+    SCHEDULER_LEADER_TTL_SECONDS = int(os.getenv('SCHEDULER_LEADER_TTL_SECONDS', '30'))
     
+    # Upstream rate limiting (requests per second and burst size per host, rate <= 0 disables)
+    UPSTREAM_RATE_LIMIT_PER_SECOND = float(os.getenv('UPSTREAM_RATE_LIMIT_PER_SECOND', '10'))
+    UPSTREAM_RATE_LIMIT_BURST = int(os.getenv('UPSTREAM_RATE_LIMIT_BURST', '20'))
+    # Per-host overrides, e.g. "cognito-idp.ca-central-1.amazonaws.com=5:10,api.tracker-suivi.apps.cic.gc.ca=20:40"
+    UPSTREAM_RATE_LIMITS = os.getenv('UPSTREAM_RATE_LIMITS', '')
+
+    # Upstream endpoints, override to point the checker at a local mock server for load testing
+    IRCC_COGNITO_URL = os.getenv('IRCC_COGNITO_URL', 'https://cognito-idp.ca-central-1.amazonaws.com/')
+    IRCC_CITIZEN_API_URL = os.getenv('IRCC_CITIZEN_API_URL', 'https://api.tracker-suivi.apps.cic.gc.ca/user')
+    IRCC_IMMIGRANT_API_URL = os.getenv('IRCC_IMMIGRANT_API_URL', 'https://api.ircc-tracker-suivi.apps.cic.gc.ca/user')
+
+    # Record upstream API responses to IRCC_CASSETTE_PATH ('record') or answer from it without network ('replay')
+    IRCC_CASSETTE_MODE = os.getenv('IRCC_CASSETTE_MODE', 'off').lower()
+    IRCC_CASSETTE_PATH = os.getenv('IRCC_CASSETTE_PATH', 'ircc_cassette.jsonl')
+
+    # JSON codec for upstream responses and API responses: 'auto' uses orjson when installed, or 'orjson' / 'json'
+    JSON_CODEC = os.getenv('JSON_CODEC', 'auto').lower()
+
+    # Upstream HTTP connection pools (keep-alive connections per host) and timeouts in seconds
+    HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '4'))
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '32'))
+    HTTP_ASYNC_POOL_MAXSIZE = int(os.getenv('HTTP_ASYNC_POOL_MAXSIZE', '200'))
+    HTTP_KEEPALIVE_SECONDS = float(os.getenv('HTTP_KEEPALIVE_SECONDS', '60'))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '10'))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+
+    # IRCC token store: tokens are dropped TOKEN_EXPIRY_MARGIN_SECONDS before expiry, and tokens used
+    # within TOKEN_REFRESH_IDLE_SECONDS are renewed in the background TOKEN_REFRESH_WINDOW_SECONDS before expiry
+    TOKEN_EXPIRY_MARGIN_SECONDS = int(os.getenv('TOKEN_EXPIRY_MARGIN_SECONDS', '60'))
+    TOKEN_REFRESH_WINDOW_SECONDS = int(os.getenv('TOKEN_REFRESH_WINDOW_SECONDS', '300'))
+    TOKEN_REFRESH_IDLE_SECONDS = int(os.getenv('TOKEN_REFRESH_IDLE_SECONDS', '3600'))
+    TOKEN_REFRESH_POLL_SECONDS = int(os.getenv('TOKEN_REFRESH_POLL_SECONDS', '30'))
+    TOKEN_REFRESH_CONCURRENCY = int(os.getenv('TOKEN_REFRESH_CONCURRENCY', '4'))
+    # 'mongo' shares encrypted tokens between processes and restarts, 'memory' keeps them per process
+    TOKEN_STORE_BACKEND = os.getenv('TOKEN_STORE_BACKEND', 'mongo').lower()
+    TOKEN_STORE_RETENTION_SECONDS = int(os.getenv('TOKEN_STORE_RETENTION_SECONDS', '604800'))
+
+    # Upstream circuit breaker: opens when CIRCUIT_BREAKER_FAILURE_RATE of at least CIRCUIT_BREAKER_MIN_REQUESTS
+    # requests within the window failed, then lets CIRCUIT_BREAKER_HALF_OPEN_PROBES probes through after the open period
+    CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv('CIRCUIT_BREAKER_FAILURE_RATE', '0.5'))
+    CIRCUIT_BREAKER_MIN_REQUESTS = int(os.getenv('CIRCUIT_BREAKER_MIN_REQUESTS', '20'))
+    CIRCUIT_BREAKER_WINDOW_SECONDS = int(os.getenv('CIRCUIT_BREAKER_WINDOW_SECONDS', '60'))
+    CIRCUIT_BREAKER_OPEN_SECONDS = int(os.getenv('CIRCUIT_BREAKER_OPEN_SECONDS', '60'))
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_BREAKER_HALF_OPEN_PROBES', '3'))
+
+    # Retries of transient upstream failures: exponential backoff with full jitter, capped by a
+    # budget of RETRY_BUDGET_RATIO retries per request plus RETRY_BUDGET_MIN_PER_SECOND
+    RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '3'))
+    RETRY_BASE_DELAY_SECONDS = float(os.getenv('RETRY_BASE_DELAY_SECONDS', '0.5'))
+    RETRY_MAX_DELAY_SECONDS = float(os.getenv('RETRY_MAX_DELAY_SECONDS', '5'))
+    RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.1'))
+    RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv('RETRY_BUDGET_MIN_PER_SECOND', '1'))
+
     # JWT configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-this')
     JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', '24'))
@@ -56,6 +139,14 @@ DEBUG=True
 
 # AES encryption key (32 bytes)
 ENCRYPTION_KEY=your-32-byte-encryption-key-here!
+ENCRYPTION_PREVIOUS_KEYS=
+ENCRYPTION_KEY_CACHE_SIZE=10000
+ENCRYPTION_MLOCK=False
+ENCRYPTION_KDF_WORKERS=0
+ENCRYPTION_WRITE_VERSION=2
+ENCRYPTION_MIGRATE_ON_START=False
+ENCRYPTION_MIGRATION_BATCH_SIZE=200
+ENCRYPTION_MIGRATION_OPS_PER_SECOND=200
 
 # Email configuration
 SMTP_SERVER=smtp.gmail.com
@@ -66,6 +157,67 @@ FROM_EMAIL=your-email@gmail.com
 
 # Scheduled task configuration
 CHECK_INTERVAL_MINUTES=10
+CHECK_POLL_SECONDS=15
+CHECK_JITTER_RATIO=0.1
+CHECK_MAX_INTERVAL_MINUTES=360
+CHECK_IDLE_BACKOFF_RATIO=0.05
+CHECK_CADENCE_OVERRIDES=
+CHECK_CONCURRENCY=8
+CHECK_MODE=threads
+CHECK_ASYNC_CONCURRENCY=500
+CHECK_BATCH_SIZE=500
+CHECK_LEASE_SECONDS=600
+CHECK_RUN_STALE_SECONDS=300
+SCHEDULER_LEADER_ELECTION=True
+SCHEDULER_LEADER_TTL_SECONDS=30
+
+# Upstream rate limiting
+UPSTREAM_RATE_LIMIT_PER_SECOND=10
+UPSTREAM_RATE_LIMIT_BURST=20
+UPSTREAM_RATE_LIMITS=
+
+# Upstream endpoints
+IRCC_COGNITO_URL=https://cognito-idp.ca-central-1.amazonaws.com/
+IRCC_CITIZEN_API_URL=https://api.tracker-suivi.apps.cic.gc.ca/user
+IRCC_IMMIGRANT_API_URL=https://api.ircc-tracker-suivi.apps.cic.gc.ca/user
+
+# Upstream response recording: off, record or replay
+IRCC_CASSETTE_MODE=off
+IRCC_CASSETTE_PATH=ircc_cassette.jsonl
+
+# JSON codec: auto, orjson or json
+JSON_CODEC=auto
+
+# Upstream HTTP connection pools
+HTTP_POOL_HOSTS=4
+HTTP_POOL_MAXSIZE=32
+HTTP_ASYNC_POOL_MAXSIZE=200
+HTTP_KEEPALIVE_SECONDS=60
+HTTP_CONNECT_TIMEOUT=10
+HTTP_READ_TIMEOUT=30
+
+# IRCC token store
+TOKEN_EXPIRY_MARGIN_SECONDS=60
+TOKEN_REFRESH_WINDOW_SECONDS=300
+TOKEN_REFRESH_IDLE_SECONDS=3600
+TOKEN_REFRESH_POLL_SECONDS=30
+TOKEN_REFRESH_CONCURRENCY=4
+TOKEN_STORE_BACKEND=mongo
+TOKEN_STORE_RETENTION_SECONDS=604800
+
+# Upstream circuit breaker
+CIRCUIT_BREAKER_FAILURE_RATE=0.5
+CIRCUIT_BREAKER_MIN_REQUESTS=20
+CIRCUIT_BREAKER_WINDOW_SECONDS=60
+CIRCUIT_BREAKER_OPEN_SECONDS=60
+CIRCUIT_BREAKER_HALF_OPEN_PROBES=3
+
+# Upstream retries
+RETRY_MAX_ATTEMPTS=3
+RETRY_BASE_DELAY_SECONDS=0.5
+RETRY_MAX_DELAY_SECONDS=5
+RETRY_BUDGET_RATIO=0.1
+RETRY_BUDGET_MIN_PER_SECOND=1
 
 # JWT configuration
 JWT_SECRET_KEY=your-jwt-secret-key
@@ -0,0 +1,138 @@
+"""Check run model for persisting progress of full credential sweeps."""
+
+from datetime import datetime, timezone, timedelta
+from typing import Self
+from uuid import uuid4
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from models.database import db_instance
+
+class CheckRun:
+    def __init__(self, owner: str):
+        self.run_id = uuid4().hex
+        self.owner = owner
+        self.status = 'running'  # 'running' or 'completed'
+        self.success_count = 0
+        self.total_count = 0
+        self.started_at = datetime.now(timezone.utc)
+        self.updated_at = datetime.now(timezone.utc)
+        self.completed_at = None
+
+    def to_dict(self):
+        """Convert to dictionary format"""
+        return {
+            '_id': self.run_id,
+            'owner': self.owner,
+            'status': self.status,
+            'success_count': self.success_count,
+            'total_count': self.total_count,
+            'started_at': self.started_at,
+            'updated_at': self.updated_at,
+            'completed_at': self.completed_at
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create check run object from dictionary"""
+        run = cls.__new__(cls)
+        run.run_id = data.get('_id')
+        run.owner = data.get('owner')
+        run.status = data.get('status', 'running')
+        run.success_count = data.get('success_count', 0)
+        run.total_count = data.get('total_count', 0)
+        run.started_at = data.get('started_at')
+        run.updated_at = data.get('updated_at')
+        run.completed_at = data.get('completed_at')
+        return run
+
+    @classmethod
+    def start(cls, owner: str) -> Self | None:
+        """Start a new run, returns None if another run is in progress
+
+        The unique single_running_run index makes the check and the insert
+        one atomic operation.
+        """
+        run = cls(owner)
+        collection = db_instance.get_collection('check_runs')
+        try:
+            collection.insert_one(run.to_dict())
+        except DuplicateKeyError:
+            return None
+        return run
+
+    @classmethod
+    def claim_unfinished(cls, owner: str, stale_after: timedelta) -> Self | None:
+        """Take over the latest unfinished run whose owner stopped making progress"""
+        collection = db_instance.get_collection('check_runs')
+        now = datetime.now(timezone.utc)
+        run_data = collection.find_one_and_update(
+            {
+                'status': 'running',
+                'updated_at': {'$lte': now - stale_after}
+            },
+            {'$set': {'owner': owner, 'updated_at': now}},
+            sort=[('started_at', -1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return cls.from_dict(run_data) if run_data else None
+
+    @classmethod
+    def has_active_run(cls) -> bool:
+        """Check if any run is still in progress"""
+        collection = db_instance.get_collection('check_runs')
+        return collection.count_documents({'status': 'running'}, limit=1) > 0
+
+    def has_unchecked_credentials(self) -> bool:
+        """Check if any active credential was not checked in this run yet"""
+        credentials_collection = db_instance.get_collection('ircc_credentials')
+        return credentials_collection.count_documents(
+            {'is_active': True, 'last_check_run_id': {'$ne': self.run_id}}, limit=1
+        ) > 0
+
+    def record_result(self, credential, success: bool):
+        """Mark a credential done for this run and update progress counters"""
+        credentials_collection = db_instance.get_collection('ircc_credentials')
+        credentials_collection.update_one(
+            {'_id': credential.id},
+            {'$set': {'last_check_run_id': self.run_id}}
+        )
+
+        collection = db_instance.get_collection('check_runs')
+        run_data = collection.find_one_and_update(
+            {'_id': self.run_id},
+            {
+                '$inc': {'success_count': 1 if success else 0, 'total_count': 1},
+                '$set': {'updated_at': datetime.now(timezone.utc)}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if run_data:
+            self.success_count = run_data.get('success_count', 0)
+            self.total_count = run_data.get('total_count', 0)
+
+    def record_skipped(self, credential_ids: list):
+        """Mark credentials done for this run without counting them"""
+        if not credential_ids:
+            return
+
+        credentials_collection = db_instance.get_collection('ircc_credentials')
+        credentials_collection.update_many(
+            {'_id': {'$in': credential_ids}},
+            {'$set': {'last_check_run_id': self.run_id}}
+        )
+
+    def complete(self):
+        """Mark run as completed"""
+        self.status = 'completed'
+        self.completed_at = datetime.now(timezone.utc)
+        self.updated_at = self.completed_at
+
+        collection = db_instance.get_collection('check_runs')
+        collection.update_one(
+            {'_id': self.run_id},
+            {'$set': {
+                'status': self.status,
+                'completed_at': self.completed_at,
+                'updated_at': self.updated_at
+            }}
+        )
@@ -1,8 +1,9 @@
 """IRCC credential model for storing and managing user immigration application credentials."""
 
 from datetime import datetime, timezone, timedelta
-from typing import Self
+from typing import Iterator, Self
 from bson import ObjectId
+from pymongo import ReturnDocument
 from models.database import db_instance
 
 class IRCCCredential:
@@ -23,6 +24,9 @@ class IRCCCredential:
         self.application_number: str | None = application_number
         self.retry_count = 0
         self.next_retry_time: datetime | None = None
+        self.next_check_at: datetime | None = None  # None means due immediately
+        self.last_changed_at: datetime | None = None  # When a change was last detected
+        self.response_fingerprint: str | None = None  # Hash of the last processed IRCC response
     def to_dict(self):
         """Convert to dictionary format"""
         return {
@@ -41,7 +45,10 @@ class IRCCCredential:
             'application_type': self.application_type,
             'application_number': self.application_number,
             'retry_count': self.retry_count,
-            'next_retry_time': self.next_retry_time
+            'next_retry_time': self.next_retry_time,
+            'next_check_at': self.next_check_at,
+            'last_changed_at': self.last_changed_at,
+            'response_fingerprint': self.response_fingerprint
         }
     
     @classmethod
@@ -70,10 +77,26 @@ class IRCCCredential:
             next_retry_time = next_retry_time.replace(tzinfo=timezone.utc)
         credential.next_retry_time = next_retry_time
         
+        next_check_at = data.get('next_check_at')
+        if next_check_at and next_check_at.tzinfo is None:
+            next_check_at = next_check_at.replace(tzinfo=timezone.utc)
+        credential.next_check_at = next_check_at
+        
+        last_changed_at = data.get('last_changed_at')
+        if last_changed_at and last_changed_at.tzinfo is None:
+            last_changed_at = last_changed_at.replace(tzinfo=timezone.utc)
+        credential.last_changed_at = last_changed_at
+        credential.response_fingerprint = data.get('response_fingerprint')
+        
         return credential
     
-    def save(self):
-        """Save credential to database"""
+    def save(self, with_password: bool = False):
+        """Save credential to database
+
+        Updates only write salt and encrypted_password when with_password is
+        set, so saving a copy loaded before a re-encryption does not restore
+        the old ciphertext.
+        """
         collection = db_instance.get_collection('ircc_credentials')
         self.updated_at = datetime.now(timezone.utc)
         
@@ -86,6 +109,9 @@ class IRCCCredential:
         if existing_credential:
             credential_dict = self.to_dict()
             credential_dict.pop('_id', None)  # Remove id field
+            if not with_password:
+                credential_dict.pop('salt')
+                credential_dict.pop('encrypted_password')
 
             # Update existing credential
             collection.update_one(
@@ -126,9 +152,122 @@ class IRCCCredential:
     @classmethod
     def get_all_active_credentials(cls):
         """Get all active credentials"""
+        return list(cls.iter_active_credentials())
+
+    @classmethod
+    def iter_active_credentials(cls, projection: dict | None = None, batch_size: int = 500, query: dict | None = None) -> Iterator[Self]:
+        """Stream active credentials from the cursor without loading them all
+
+        Credentials loaded with a projection only carry the projected fields
+        and must not be saved back.
+        """
+        collection = db_instance.get_collection('ircc_credentials')
+        cursor = collection.find({**(query or {}), 'is_active': True}, projection=projection, batch_size=batch_size)
+        try:
+            for credential_data in cursor:
+                yield cls.from_dict(credential_data)
+        finally:
+            cursor.close()
+
+    @classmethod
+    def claim_due_credentials(cls, worker_id: str, now: datetime, lease_until: datetime, limit: int) -> list[Self]:
+        """Lease credentials whose next check is due, earliest first
+
+        Each claim is an atomic find-and-modify, so concurrent checker processes
+        never receive the same credential. A lease left behind by a crashed
+        worker expires at lease_until and the credential becomes claimable again.
+        """
         collection = db_instance.get_collection('ircc_credentials')
-        credentials_data = collection.find({'is_active': True})
+        credentials = []
+        while len(credentials) < limit:
+            credential_data = collection.find_one_and_update(
+                {
+                    'is_active': True,
+                    '$and': [
+                        {'$or': [
+                            {'next_check_at': {'$lte': now}},
+                            {'next_check_at': None}
+                        ]},
+                        {'$or': [
+                            {'lease_expires_at': {'$lte': now}},
+                            {'lease_expires_at': None}
+                        ]}
+                    ]
+                },
+                {'$set': {'lease_owner': worker_id, 'lease_expires_at': lease_until}},
+                sort=[('next_check_at', 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if not credential_data:
+                break
+            credentials.append(cls.from_dict(credential_data))
+        return credentials
+
+    @classmethod
+    def claim_credentials(cls, worker_id: str, credential_ids: list[ObjectId], now: datetime, lease_until: datetime) -> list[Self]:
+        """Lease the given credentials that no other worker holds, returns the claimed ones
+
+        Claimed credentials are reloaded, so they reflect any check that
+        finished since the caller read them.
+        """
+        if not credential_ids:
+            return []
+
+        collection = db_instance.get_collection('ircc_credentials')
+        collection.update_many(
+            {
+                '_id': {'$in': credential_ids},
+                'is_active': True,
+                '$or': [
+                    {'lease_expires_at': {'$lte': now}},
+                    {'lease_expires_at': None}
+                ]
+            },
+            {'$set': {'lease_owner': worker_id, 'lease_expires_at': lease_until}}
+        )
+        credentials_data = collection.find({
+            '_id': {'$in': credential_ids},
+            'lease_owner': worker_id,
+            'lease_expires_at': lease_until
+        })
         return [cls.from_dict(credential_data) for credential_data in credentials_data]
+
+    @classmethod
+    def release_leases(cls, worker_id: str, credential_ids: list[ObjectId], fallback_next_check_at: datetime):
+        """Release leases held by worker_id
+
+        Credentials whose check did not move next_check_at forward are pushed
+        to fallback_next_check_at so they are not claimed again immediately.
+        """
+        if not credential_ids:
+            return
+
+        collection = db_instance.get_collection('ircc_credentials')
+        collection.update_many(
+            {
+                '_id': {'$in': credential_ids},
+                'lease_owner': worker_id,
+                '$or': [
+                    {'next_check_at': {'$lte': datetime.now(timezone.utc)}},
+                    {'next_check_at': None}
+                ]
+            },
+            {'$set': {'next_check_at': fallback_next_check_at}}
+        )
+        collection.update_many(
+            {'_id': {'$in': credential_ids}, 'lease_owner': worker_id},
+            {'$set': {'lease_owner': None, 'lease_expires_at': None}}
+        )
+
+    def schedule_next_check(self, next_check_at: datetime):
+        """Set when this credential is next due for a check"""
+        self.next_check_at = next_check_at
+        
+        collection = db_instance.get_collection('ircc_credentials')
+        collection.update_one(
+            {'_id': self.id},
+            {'$set': {'next_check_at': self.next_check_at, 'updated_at': datetime.now(timezone.utc)}}
+        )
     
     def update_status(self, status, timestamp=None):
         """Update status information"""
@@ -149,6 +288,17 @@ class IRCCCredential:
             }}
         )
     
+    def touch_last_checked(self, next_check_at: datetime):
+        """Record an unchanged check without rewriting the rest of the document"""
+        self.last_checked = datetime.now(timezone.utc)
+        self.next_check_at = next_check_at
+        
+        collection = db_instance.get_collection('ircc_credentials')
+        collection.update_one(
+            {'_id': self.id},
+            {'$set': {'last_checked': self.last_checked, 'next_check_at': self.next_check_at}}
+        )
+    
     def deactivate(self):
         """Deactivate credential"""
         self.is_active = False
@@ -162,6 +312,9 @@ class IRCCCredential:
 
     def update_retry_info(self, success: bool = True):
         """Update retry information"""
+        if success and self.retry_count == 0 and self.next_retry_time is None:
+            return  # Nothing to reset
+        
         if success:
             self.retry_count = 0
             self.next_retry_time = None
@@ -191,6 +344,8 @@ class IRCCCredential:
                 wait_hours = 24
             
             self.next_retry_time = datetime.now(timezone.utc) + timedelta(hours=wait_hours)
+            # Retries are dispatched by the same due-time scheduler as normal checks
+            self.next_check_at = self.next_retry_time
         
         collection = db_instance.get_collection('ircc_credentials')
         collection.update_one(
@@ -198,6 +353,7 @@ class IRCCCredential:
             {'$set': {
                 'retry_count': self.retry_count,
                 'next_retry_time': self.next_retry_time,
+                'next_check_at': self.next_check_at,
                 'updated_at': datetime.now(timezone.utc)
             }}
         ) 
\ No newline at end of file
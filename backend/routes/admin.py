@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from models.user import User
 from models.ircc_credential import IRCCCredential
+from services.encryption_migration import encryption_migration
 from services.scheduler import task_scheduler
 from services.ircc_checker import ircc_checker
 from routes.auth import require_admin
@@ -21,15 +22,16 @@ def get_dashboard_stats():
         all_users = User.get_all_users()
         active_users = [user for user in all_users if user.is_active]
 
-        # Get credential statistics
-        all_credentials = IRCCCredential.get_all_active_credentials()
-
         # Get scheduler status
         scheduler_status = task_scheduler.get_job_status()
 
         # Calculate status distribution
+        credential_count = 0
         status_counts = {}
-        for credential in all_credentials:
+        for credential in IRCCCredential.iter_active_credentials(
+            projection={"last_status": 1}
+        ):
+            credential_count += 1
             status = credential.last_status or "Unknown"
             status_counts[status] = status_counts.get(status, 0) + 1
 
@@ -42,7 +44,7 @@ def get_dashboard_stats():
                         "inactive": len(all_users) - len(active_users),
                     },
                     "credentials": {
-                        "total": len(all_credentials),
+                        "total": credential_count,
                         "status_distribution": status_counts,
                     },
                     "scheduler": scheduler_status,
@@ -291,6 +293,52 @@ def trigger_immediate_check():
         return jsonify({"error": "Trigger failed"}), 500
 
 
+@admin_bp.route("/encryption/status", methods=["GET"])
+@require_admin
+def get_encryption_status():
+    """Get stored password re-encryption progress"""
+    try:
+        return jsonify(encryption_migration.get_status()), 200
+
+    except Exception as e:
+        logger.error(f"Failed to get encryption status: {str(e)}")
+        return jsonify({"error": "Failed to get status"}), 500
+
+
+@admin_bp.route("/encryption/migrate", methods=["POST"])
+@require_admin
+def trigger_encryption_migration():
+    """Re-encrypt stored passwords in the current format"""
+    try:
+        if encryption_migration.is_running:
+            return jsonify({"error": "Encryption migration is already running"}), 409
+
+        job_id = task_scheduler.add_one_time_job(encryption_migration.run)
+        if not job_id:
+            return jsonify({"error": "Trigger migration failed"}), 500
+
+        logger.info(
+            f"Admin {request.current_user['email']} triggered encryption migration"
+        )
+        return (
+            jsonify({"message": "Encryption migration triggered", "job_id": job_id}),
+            202,
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to trigger encryption migration: {str(e)}")
+        return jsonify({"error": "Trigger failed"}), 500
+
+
+@admin_bp.route("/encryption/migrate/stop", methods=["POST"])
+@require_admin
+def stop_encryption_migration():
+    """Stop a running re-encryption after its current batch"""
+    encryption_migration.stop()
+    logger.info(f"Admin {request.current_user['email']} stopped encryption migration")
+    return jsonify({"message": "Encryption migration stopping"}), 200
+
+
 @admin_bp.route("/logs", methods=["GET"])
 @require_admin
 def get_system_logs():
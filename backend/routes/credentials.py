@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from bson import ObjectId
 from flask import Blueprint, request, jsonify
 from config import Config
@@ -72,7 +72,7 @@ def upload_credential():
             application_number = application_summary[0].application_number
             credential.application_number = application_number
 
-        credential_id = credential.save()
+        credential_id = credential.save(with_password=True)
         logger.info(
             "User %s uploaded IRCC credentials successfully: %s",
             current_user_email,
@@ -84,7 +84,7 @@ def upload_credential():
                 jsonify(
                     {
                         "message": f"IRCC credentials uploaded successfully. But login may failed. {login_error}",
-                        "credential_id": str(credential_id),
+                        "credential_id": credential_id,
                     }
                 ),
                 201,
@@ -94,7 +94,7 @@ def upload_credential():
                 jsonify(
                     {
                         "message": "IRCC credentials uploaded successfully",
-                        "credential_id": str(credential_id),
+                        "credential_id": credential_id,
                     }
                 ),
                 201,
@@ -116,7 +116,7 @@ def get_my_credentials():
         for credential in credentials:
             credential_list.append(
                 {
-                    "id": str(credential.id),
+                    "id": credential.id,
                     "ircc_username": credential.ircc_username,
                     "application_number": credential.application_number,
                     "application_type": credential.application_type,
@@ -206,7 +206,7 @@ def update_credential(credential_id: str):
         if notification_email:
             credential.email = notification_email
 
-        credential.save()
+        credential.save(with_password=bool(ircc_password))
 
         logger.info(
             "User %s updated IRCC credentials successfully: %s",
@@ -230,7 +230,9 @@ def delete_credential(ircc_username: str):
             # Find existing credentials
             credentials = IRCCCredential.find_by_user_id(request.current_user["email"])
         else:
-            credentials = IRCCCredential.get_all_active_credentials()
+            credentials = IRCCCredential.iter_active_credentials(
+                query={"ircc_username": ircc_username}
+            )
         credential = None
 
         for cred in credentials:
@@ -261,7 +263,39 @@ def delete_credential(ircc_username: str):
 @require_auth
 def refresh_credential():
     """Refresh IRCC credentials"""
-    pass
+    try:
+        data = request.get_json()
+
+        if not data or not data.get("credential_id"):
+            return jsonify({"error": "Credential ID cannot be empty"}), 400
+
+        if not ObjectId.is_valid(data.get("credential_id")):
+            return jsonify({"error": "Invalid credential ID"}), 400
+
+        credential = IRCCCredential.find_by_id(data.get("credential_id"))
+        if not credential or not credential.is_active:
+            return jsonify({"error": "Specified credentials not found"}), 404
+
+        if (
+            credential.user_id != request.current_user["email"]
+            and request.current_user["role"] != "admin"
+        ):
+            return jsonify({"error": "Unauthorized"}), 403
+
+        # Make the credential due now, the scheduler picks it up on its next poll
+        credential.schedule_next_check(datetime.now(timezone.utc))
+
+        logger.info(
+            "User %s requested refresh of IRCC credentials: %s",
+            request.current_user["email"],
+            credential.ircc_username,
+        )
+
+        return jsonify({"message": "IRCC credentials refresh scheduled"}), 200
+
+    except Exception as e:
+        logger.error("Refresh IRCC credentials failed: %s", str(e))
+        return jsonify({"error": "Refresh failed, please try again later"}), 500
 
 
 @credentials_bp.route("/all", methods=["GET"])
@@ -269,7 +303,9 @@ def refresh_credential():
 def get_all_credentials():
     """Admin get all credentials"""
     try:
-        credentials = IRCCCredential.get_all_active_credentials()
+        credentials = IRCCCredential.iter_active_credentials(
+            projection={"salt": 0, "encrypted_password": 0}
+        )
 
         credential_list = []
         for credential in credentials:
@@ -278,7 +314,7 @@ def get_all_credentials():
                     "user_id": credential.user_id,
                     "ircc_username": credential.ircc_username,
                     "email": credential.email,
-                    "id": str(credential.id),
+                    "id": credential.id,
                     "application_type": credential.application_type,
                     "is_active": credential.is_active,
                     "created_at": credential.created_at,
@@ -0,0 +1,80 @@
+"""Adaptive polling cadence for IRCC status checks based on application activity."""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from config import Config
+
+
+class CadencePolicy:
+    """Poll recently active applications often and back off for dormant ones.
+
+    The interval grows in proportion to how long the application has been
+    idle, clamped between min_minutes and max_minutes.
+    """
+
+    def __init__(self, min_minutes: float, max_minutes: float, idle_ratio: float):
+        self.min_minutes = min_minutes
+        self.max_minutes = max(max_minutes, min_minutes)
+        self.idle_ratio = idle_ratio
+
+    def next_interval(
+        self, last_activity: Optional[datetime], now: Optional[datetime] = None
+    ) -> timedelta:
+        """Get interval until the next check"""
+        if last_activity is None:
+            return timedelta(minutes=self.min_minutes)
+
+        now = now or datetime.now(timezone.utc)
+        idle_minutes = max((now - last_activity).total_seconds() / 60, 0)
+        minutes = min(
+            max(idle_minutes * self.idle_ratio, self.min_minutes), self.max_minutes
+        )
+        return timedelta(minutes=minutes)
+
+
+class CadencePolicies:
+    def __init__(
+        self,
+        default_policy: CadencePolicy,
+        type_policies: Optional[Dict[str, CadencePolicy]] = None,
+    ):
+        self.default_policy = default_policy
+        self.type_policies = type_policies or {}
+
+    @classmethod
+    def from_config(cls) -> "CadencePolicies":
+        """Create cadence policies from Config"""
+        default_policy = CadencePolicy(
+            Config.CHECK_INTERVAL_MINUTES,
+            Config.CHECK_MAX_INTERVAL_MINUTES,
+            Config.CHECK_IDLE_BACKOFF_RATIO,
+        )
+        return cls(
+            default_policy,
+            cls.parse_type_policies(Config.CHECK_CADENCE_OVERRIDES, default_policy),
+        )
+
+    @staticmethod
+    def parse_type_policies(
+        value: str, default_policy: CadencePolicy
+    ) -> Dict[str, CadencePolicy]:
+        """Parse 'type=min:max[:ratio],type=min:max' overrides"""
+        type_policies = {}
+        for item in filter(None, (part.strip() for part in value.split(","))):
+            application_type, limits = item.split("=", 1)
+            parts = limits.split(":")
+            type_policies[application_type.strip()] = CadencePolicy(
+                float(parts[0]),
+                float(parts[1]) if len(parts) > 1 else default_policy.max_minutes,
+                float(parts[2]) if len(parts) > 2 else default_policy.idle_ratio,
+            )
+        return type_policies
+
+    def for_type(self, application_type: Optional[str]) -> CadencePolicy:
+        """Get policy for an application type"""
+        return self.type_policies.get(application_type, self.default_policy)
+
+
+# Global cadence policies instance
+cadence_policies = CadencePolicies.from_config()
@@ -0,0 +1,232 @@
+"""Online re-encryption of stored IRCC passwords in the current ciphertext format and key."""
+
+import logging
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+from config import Config
+from models.database import db_instance
+from utils.encryption import encryption_manager, reencrypt_many
+
+logger = logging.getLogger(__name__)
+
+
+class EncryptionMigration:
+    """Rewrites ircc_credentials passwords that use the legacy format or an old key.
+
+    Documents are streamed in _id order and written back with throttled
+    bulk writes. Each update only matches if the password is unchanged since
+    it was read, so credentials edited during the migration are never
+    overwritten. Checks keep running throughout because every accepted key
+    and format decrypts. Progress is checkpointed per batch in
+    maintenance_checkpoints, and an interrupted run resumes after the last
+    written batch.
+    """
+
+    collection_name = 'ircc_credentials'
+    checkpoint_collection_name = 'maintenance_checkpoints'
+
+    def __init__(self, batch_size: int, ops_per_second: float, workers: int = 1):
+        self.batch_size = max(batch_size, 1)
+        self.ops_per_second = ops_per_second
+        # Batches re-encrypted in parallel processes, 1 keeps the work in this process
+        self.workers = max(workers, 1)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.last_result: Dict[str, Any] | None = None
+
+    @classmethod
+    def from_config(cls) -> "EncryptionMigration":
+        """Create migration from configuration"""
+        return cls(
+            Config.ENCRYPTION_MIGRATION_BATCH_SIZE,
+            Config.ENCRYPTION_MIGRATION_OPS_PER_SECOND,
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self.lock.locked()
+
+    @property
+    def checkpoint_id(self) -> str:
+        """Checkpoint name, a new key starts a new checkpoint"""
+        return f"encryption_migration:{encryption_manager.key_id}"
+
+    def _pending_query(self) -> Dict[str, Any]:
+        """Match passwords not yet in the current format"""
+        prefix = re.compile('^' + re.escape(encryption_manager.current_prefix))
+        return {'encrypted_password': {'$type': 'string', '$not': prefix}}
+
+    def count_pending(self) -> int:
+        """Count credentials still to be re-encrypted"""
+        collection = db_instance.get_collection(self.collection_name)
+        return collection.count_documents(self._pending_query())
+
+    def get_checkpoint(self) -> Dict[str, Any] | None:
+        """Get saved progress of the current key's migration"""
+        collection = db_instance.get_collection(self.checkpoint_collection_name)
+        return collection.find_one({'_id': self.checkpoint_id})
+
+    def _save_checkpoint(self, last_id: Any, result: Dict[str, Any], completed: bool = False):
+        collection = db_instance.get_collection(self.checkpoint_collection_name)
+        now = datetime.now(timezone.utc)
+        collection.update_one(
+            {'_id': self.checkpoint_id},
+            {'$set': {
+                # A completed migration starts from the beginning next time
+                'last_id': None if completed else last_id,
+                'result': dict(result),
+                'updated_at': now,
+                'completed_at': now if completed else None,
+            }},
+            upsert=True,
+        )
+
+    def _read_batches(self, last_id: Any, count: int) -> List[List[Dict[str, Any]]]:
+        """Read up to count consecutive batches after last_id"""
+        collection = db_instance.get_collection(self.collection_name)
+        query = self._pending_query()
+        batches = []
+        for _ in range(count):
+            batch_query = dict(query, _id={'$gt': last_id}) if last_id is not None else query
+            documents = list(
+                collection.find(batch_query, {'salt': 1, 'encrypted_password': 1})
+                .sort('_id', 1)
+                .limit(self.batch_size)
+            )
+            if not documents:
+                break
+            batches.append(documents)
+            last_id = documents[-1]['_id']
+        return batches
+
+    @staticmethod
+    def _batch_items(documents: List[Dict[str, Any]]) -> List[tuple[str, str]]:
+        return [
+            (document.get('salt') or '', document['encrypted_password'])
+            for document in documents
+        ]
+
+    def _build_updates(
+        self, documents: List[Dict[str, Any]], reencrypted: List[tuple[str | None, str | None]]
+    ) -> tuple[List[UpdateOne], int]:
+        """Build updates for a batch, returns updates and number of failures"""
+        updates = []
+        failed = 0
+        for document, (new_value, error) in zip(documents, reencrypted):
+            if error:
+                logger.error(f"Failed to re-encrypt credential {document['_id']}: {error}")
+                failed += 1
+                continue
+            updates.append(UpdateOne(
+                {'_id': document['_id'], 'encrypted_password': document['encrypted_password']},
+                {'$set': {'encrypted_password': new_value}},
+            ))
+        return updates, failed
+
+    def _throttle(self, started_at: float, operations: int):
+        """Sleep so writes since started_at stay under ops_per_second"""
+        if self.ops_per_second <= 0:
+            return
+        remaining = operations / self.ops_per_second - (time.monotonic() - started_at)
+        if remaining > 0:
+            self.stop_event.wait(remaining)
+
+    def run(self, restart: bool = False) -> Dict[str, Any]:
+        """Re-encrypt all pending credentials, returns counts"""
+        if not self.lock.acquire(blocking=False):
+            logger.info("Encryption migration is already running")
+            return {'status': 'already_running'}
+
+        self.stop_event.clear()
+        result = {'status': 'running', 'migrated': 0, 'failed': 0, 'skipped': 0}
+        self.last_result = result
+        pool = None
+        try:
+            if encryption_manager.write_version == 1:
+                logger.warning("ENCRYPTION_WRITE_VERSION is 1, nothing to migrate")
+                result['status'] = 'disabled'
+                return result
+
+            checkpoint = None if restart else self.get_checkpoint()
+            last_id = checkpoint.get('last_id') if checkpoint else None
+            if last_id is not None:
+                logger.info(f"Resuming encryption migration after credential {last_id}")
+            logger.info(
+                f"Encryption migration started with {self.workers} worker(s), "
+                f"{self.count_pending()} credentials pending"
+            )
+            if self.workers > 1:
+                pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+            collection = db_instance.get_collection(self.collection_name)
+            started_at = time.monotonic()
+            operations = 0
+            while not self.stop_event.is_set():
+                batches = self._read_batches(last_id, self.workers)
+                if not batches:
+                    break
+
+                items = [self._batch_items(documents) for documents in batches]
+                if pool:
+                    results = pool.map(reencrypt_many, items)
+                else:
+                    # Legacy keys of the batch are derived in parallel processes
+                    encryption_manager.prederive_keys(items[0])
+                    results = map(reencrypt_many, items)
+
+                for documents, reencrypted in zip(batches, results):
+                    updates, failed = self._build_updates(documents, reencrypted)
+                    result['failed'] += failed
+                    if updates:
+                        write_result = collection.bulk_write(updates, ordered=False)
+                        result['migrated'] += write_result.modified_count
+                        # Updated by someone else since the batch was read
+                        result['skipped'] += len(updates) - write_result.modified_count
+                    last_id = documents[-1]['_id']
+                    self._save_checkpoint(last_id, result)
+                    operations += len(documents)
+                    self._throttle(started_at, operations)
+
+            result['status'] = 'stopped' if self.stop_event.is_set() else 'completed'
+            self._save_checkpoint(last_id, result, completed=result['status'] == 'completed')
+            logger.info(
+                f"Encryption migration {result['status']} - Migrated: {result['migrated']}, "
+                f"Failed: {result['failed']}, Skipped: {result['skipped']}"
+            )
+            return result
+        except Exception as e:
+            logger.error(f"Encryption migration failed: {str(e)}")
+            result['status'] = 'error'
+            return result
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            self.lock.release()
+
+    def stop(self):
+        """Ask a running migration to stop after the current batch"""
+        self.stop_event.set()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get migration progress"""
+        return {
+            'is_running': self.is_running,
+            'pending': self.count_pending(),
+            'last_result': self.last_result,
+            'checkpoint': self.get_checkpoint(),
+        }
+
+
+# Global encryption migration instance
+encryption_migration = EncryptionMigration.from_config()
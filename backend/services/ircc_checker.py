@@ -1,18 +1,40 @@
 from types import TracebackType
+import asyncio
+import aiohttp
 import requests
+import hashlib
 import json
+import os
+import random
+import socket
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import islice
+from typing import Callable, Iterable, Iterator
 import re
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from models.application_records import ApplicationRecord
 from utils.ircc_agent import IRCCAgentFactory
+from utils.async_ircc_agent import AsyncIRCCAgentFactory
+from utils.circuit_breaker import (
+    CircuitOpenError,
+    UpstreamUnavailableError,
+    circuit_breakers,
+)
+from utils.http_session import create_http_session
 from utils.email_sender import email_sender
+from utils.encryption import encryption_manager
 from models.ircc_credential import IRCCCredential
+from models.check_run import CheckRun
+from services.check_cadence import cadence_policies
 from config import Config
 import logging
 import traceback
 
 logger = logging.getLogger(__name__)
 
+CheckCallback = Callable[[IRCCCredential, bool], None]
+
 
 class ApplicationRecordChange:
     def __init__(self, status: str, change_type: str, old_value: str, new_value: str):
@@ -32,7 +54,9 @@ class ApplicationRecordChange:
 
 class IRCCChecker:
     def __init__(self):
-        self.session = requests.Session()
+        # Identifies this process when leasing credentials shared with other checkers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.session = create_http_session()
         self.session.headers.update(
             {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -119,40 +143,38 @@ class IRCCChecker:
         """Check single credential's IRCC status"""
         try:
             # Send request to check status
-            application_details = self._make_ircc_request(credential)
-
-            if application_details:
-                # get current status and timestamp
-                current_status = application_details.status
-                current_timestamp = application_details.last_updated_time
-                if self._status_changed(credential, current_status, current_timestamp):
-                    last_application_record = ApplicationRecord.get_latest_record(
-                        credential.application_number
-                    )
+            response = self._make_ircc_request(credential)
 
-                    changes = self.compare_application_details(
-                        last_application_record, application_details
-                    )
-                    if changes:
-                        # Send email notification
-                        if credential.email:
-                            email_sender.send_status_update_email(
-                                credential.email,
-                                credential.ircc_username,
-                                credential.application_number,
-                                "\n".join([str(change) for change in changes]),
-                                datetime.fromtimestamp(current_timestamp / 1000),
-                            )
-
-                        logger.info(
-                            f"Status change detected - User: {credential.ircc_username}, New status: {current_status}"
-                        )
+            if response:
+                self._process_application_response(credential, response)
+                return True
+            else:
+                logger.warning(
+                    f"Unable to get status information for user {credential.ircc_username}"
+                )
+                return False
 
-                    application_details.save()
-                # Update credential status
-                credential.update_status(current_status, current_timestamp)
-                credential.save()
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            error_msg = (
+                f"Error checking status for user {credential.ircc_username}: {str(e)}"
+            )
+            logger.error(error_msg)
+            logger.error(traceback.format_exc())
+            raise
+
+    async def check_single_credential_async(self, credential: IRCCCredential) -> bool:
+        """Check single credential's IRCC status on the event loop"""
+        try:
+            # Send request to check status
+            response = await self._make_ircc_request_async(credential)
 
+            if response:
+                # Persistence and email use blocking clients
+                await asyncio.to_thread(
+                    self._process_application_response, credential, response
+                )
                 return True
             else:
                 logger.warning(
@@ -160,6 +182,8 @@ class IRCCChecker:
                 )
                 return False
 
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             error_msg = (
                 f"Error checking status for user {credential.ircc_username}: {str(e)}"
@@ -168,26 +192,427 @@ class IRCCChecker:
             logger.error(traceback.format_exc())
             raise
 
-    def check_all_credentials(self):
-        """Check status of all active credentials"""
-        credentials = IRCCCredential.get_all_active_credentials()
+    @staticmethod
+    def fingerprint_response(response: dict) -> str:
+        """Get stable content hash of an upstream response"""
+        normalized = json.dumps(
+            response, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _process_application_response(self, credential: IRCCCredential, response: dict):
+        """Process raw application details, skipping work when nothing changed"""
+        fingerprint = self.fingerprint_response(response)
+        if fingerprint == credential.response_fingerprint:
+            # Identical to the last processed response, only record the check
+            credential.touch_last_checked(
+                self._next_check_time(credential, credential.last_timestamp)
+            )
+            return
+
+        ircc_agent = IRCCAgentFactory.get_ircc_agent(credential.application_type)
+        application_details = ircc_agent.parse_application_details(credential, response)
+        credential.response_fingerprint = fingerprint
+        self._save_application_details(credential, application_details)
+
+    def _save_application_details(
+        self, credential: IRCCCredential, application_details: ApplicationRecord
+    ):
+        """Persist fetched application details and notify on changes"""
+        # get current status and timestamp
+        current_status = application_details.status
+        current_timestamp = application_details.last_updated_time
+        if self._status_changed(credential, current_status, current_timestamp):
+            last_application_record = ApplicationRecord.get_latest_record(
+                credential.application_number
+            )
+
+            changes = self.compare_application_details(
+                last_application_record, application_details
+            )
+            if changes:
+                credential.last_changed_at = datetime.now(timezone.utc)
+                # Send email notification
+                if credential.email:
+                    email_sender.send_status_update_email(
+                        credential.email,
+                        credential.ircc_username,
+                        credential.application_number,
+                        "\n".join([str(change) for change in changes]),
+                        datetime.fromtimestamp(current_timestamp / 1000),
+                    )
+
+                logger.info(
+                    f"Status change detected - User: {credential.ircc_username}, New status: {current_status}"
+                )
+
+            application_details.save()
+        # Update credential status
+        credential.next_check_at = self._next_check_time(
+            credential, current_timestamp
+        )
+        credential.update_status(current_status, current_timestamp)
+        credential.save()
+
+    def _next_check_time(
+        self, credential: IRCCCredential, last_updated_time: int | None
+    ) -> datetime:
+        """Get next check time from the application's activity, jittered so checks spread out"""
+        activity_times = [credential.last_changed_at]
+        if last_updated_time:
+            activity_times.append(
+                datetime.fromtimestamp(last_updated_time / 1000, tz=timezone.utc)
+            )
+        activity_times = [time for time in activity_times if time]
+        last_activity = max(activity_times) if activity_times else None
+
+        policy = cadence_policies.for_type(credential.application_type)
+        interval = policy.next_interval(last_activity)
+        jitter = random.uniform(-Config.CHECK_JITTER_RATIO, Config.CHECK_JITTER_RATIO)
+        return datetime.now(timezone.utc) + interval * (1 + jitter)
+
+    def check_all_credentials(self, max_workers: int | None = None):
+        """Check status of all active credentials
+
+        Progress is checkpointed per credential, so a run interrupted by a
+        restart is resumed where it stopped instead of starting over.
+        """
+        result = self.resume_check_run(max_workers)
+        if result is not None:
+            return result
+
+        run = CheckRun.start(self.worker_id)
+        if run is None:
+            logger.warning("Another full check run is in progress, skipping")
+            return 0, 0
+        logger.info(f"Starting check run {run.run_id}")
+
+        return self._continue_check_run(run, max_workers)
+
+    def resume_check_run(self, max_workers: int | None = None):
+        """Resume a full check run abandoned by a restarted or crashed process"""
+        run = CheckRun.claim_unfinished(
+            self.worker_id, timedelta(seconds=Config.CHECK_RUN_STALE_SECONDS)
+        )
+        if not run:
+            return None
+
+        logger.info(
+            f"Resuming check run {run.run_id}: {run.success_count}/{run.total_count} already checked"
+        )
+        return self._continue_check_run(run, max_workers)
+
+    def _continue_check_run(self, run: CheckRun, max_workers: int | None = None):
+        """Check credentials not yet done in the run
+
+        Credentials are leased a batch at a time like due checks, so a due
+        check never runs alongside the full run's check of the same credential.
+        """
+        credentials = IRCCCredential.iter_active_credentials(
+            batch_size=Config.CHECK_BATCH_SIZE,
+            query={"last_check_run_id": {"$ne": run.run_id}},
+        )
+        while batch := list(islice(credentials, Config.CHECK_BATCH_SIZE)):
+            if circuit_breakers.any_open():
+                logger.warning("Upstream circuit open, pausing check run dispatch")
+                break
+
+            now = datetime.now(timezone.utc)
+            claimed = IRCCCredential.claim_credentials(
+                self.worker_id,
+                [credential.id for credential in batch],
+                now,
+                now + timedelta(seconds=Config.CHECK_LEASE_SECONDS),
+            )
+            claimed_ids = {credential.id for credential in claimed}
+            # Leased by another checker, which is checking them right now
+            run.record_skipped(
+                [credential.id for credential in batch if credential.id not in claimed_ids]
+            )
+            try:
+                self._run_checks(claimed, max_workers, on_checked=run.record_result)
+            finally:
+                self._release_leases(claimed)
+
+        if run.has_unchecked_credentials():
+            # Dispatch was paused by an upstream outage, the run is resumed once it goes stale
+            logger.warning(
+                f"Check run {run.run_id} paused: {run.success_count}/{run.total_count} successful so far"
+            )
+            return run.success_count, run.total_count
+        run.complete()
+
+        logger.info(
+            f"Check run {run.run_id} completed: {run.success_count}/{run.total_count} successful"
+        )
+        return run.success_count, run.total_count
+
+    def check_due_credentials(self, max_workers: int | None = None):
+        """Check credentials whose next check time has passed"""
         success_count = 0
-        total_count = len(credentials)
+        total_count = 0
+
+        while True:
+            if circuit_breakers.any_open():
+                logger.warning("Upstream circuit open, skipping due credential checks")
+                break
+
+            now = datetime.now(timezone.utc)
+            credentials = IRCCCredential.claim_due_credentials(
+                self.worker_id,
+                now,
+                now + timedelta(seconds=Config.CHECK_LEASE_SECONDS),
+                Config.CHECK_BATCH_SIZE,
+            )
+            if not credentials:
+                break
 
-        logger.info(f"Starting to check IRCC status for {total_count} users")
+            try:
+                batch_success_count, batch_total_count = self._run_checks(
+                    credentials, max_workers
+                )
+            finally:
+                self._release_leases(credentials)
+            success_count += batch_success_count
+            total_count += batch_total_count
+
+            if len(credentials) < Config.CHECK_BATCH_SIZE:
+                break
+
+        return success_count, total_count
+
+    def _release_leases(self, credentials: list[IRCCCredential]):
+        """Release leases of checked credentials"""
+        # Credentials skipped during an outage are retried when the circuit half-opens
+        retry_after = circuit_breakers.retry_after()
+        IRCCCredential.release_leases(
+            self.worker_id,
+            [credential.id for credential in credentials],
+            datetime.now(timezone.utc)
+            + (
+                timedelta(seconds=retry_after)
+                if retry_after
+                else timedelta(minutes=Config.CHECK_INTERVAL_MINUTES)
+            ),
+        )
 
-        for credential in credentials:
+    @staticmethod
+    def _with_prederived_keys(
+        credentials: Iterable[IRCCCredential],
+    ) -> Iterator[IRCCCredential]:
+        """Yield credentials, deriving legacy password keys a batch at a time ahead of dispatch"""
+        iterator = iter(credentials)
+        while batch := list(islice(iterator, Config.CHECK_BATCH_SIZE)):
             try:
-                if self.check_single_credential(credential):
-                    success_count += 1
+                encryption_manager.prederive_keys(
+                    (credential.salt, credential.encrypted_password) for credential in batch
+                )
             except Exception as e:
-                logger.error(f"Exception occurred while checking credential: {str(e)}")
-                logger.error(traceback.format_exc())
+                # Keys are derived on demand instead
+                logger.error(f"Failed to pre-derive credential keys: {str(e)}")
+            yield from batch
+
+    def _run_checks(
+        self,
+        credentials: Iterable[IRCCCredential],
+        max_workers: int | None = None,
+        on_checked: CheckCallback | None = None,
+    ):
+        """Check credentials with the configured execution mode"""
+        credentials = self._with_prederived_keys(credentials)
+        if Config.CHECK_MODE == "async":
+            return asyncio.run(
+                self.check_credentials_async(credentials, max_workers, on_checked)
+            )
+        return self.check_credentials(credentials, max_workers, on_checked)
+
+    def check_credentials(
+        self,
+        credentials: Iterable[IRCCCredential],
+        max_workers: int | None = None,
+        on_checked: CheckCallback | None = None,
+    ):
+        """Check credentials on a bounded thread pool"""
+        success_count = 0
+        total_count = 0
+        max_workers = max_workers or Config.CHECK_CONCURRENCY
+
+        logger.info(f"Starting to check IRCC status with {max_workers} workers")
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="IRCCCheckWorker"
+        ) as executor:
+            pending = set()
+            for credential in credentials:
+                if circuit_breakers.any_open():
+                    logger.warning(
+                        "Upstream circuit open, pausing dispatch of remaining credentials"
+                    )
+                    break
+                # Only pull from the cursor as fast as workers free up
+                if len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    success_count += sum(1 for future in done if future.result())
+                pending.add(
+                    executor.submit(
+                        self._check_credential_isolated, credential, on_checked
+                    )
+                )
+                total_count += 1
+            for future in as_completed(pending):
+                if future.result():
+                    success_count += 1
+
+        logger.info(f"Status check completed: {success_count}/{total_count} successful")
+        return success_count, total_count
+
+    async def check_credentials_async(
+        self,
+        credentials: Iterable[IRCCCredential],
+        max_concurrency: int | None = None,
+        on_checked: CheckCallback | None = None,
+    ):
+        """Check credentials concurrently on the running event loop"""
+        success_count = 0
+        total_count = 0
+        max_concurrency = max_concurrency or Config.CHECK_ASYNC_CONCURRENCY
+        semaphore = asyncio.Semaphore(max_concurrency)
+        tasks = set()
+        credential_iterator = iter(credentials)
+
+        logger.info(
+            f"Starting to check IRCC status with {max_concurrency} concurrent requests"
+        )
+
+        async def check(credential: IRCCCredential):
+            nonlocal success_count
+            try:
+                if await self._check_credential_isolated_async(credential, on_checked):
+                    success_count += 1
+            finally:
+                semaphore.release()
+
+        try:
+            while True:
+                # Cursor iteration blocks on Mongo, keep it off the event loop
+                batch = await asyncio.to_thread(
+                    list, islice(credential_iterator, Config.CHECK_BATCH_SIZE)
+                )
+                if not batch:
+                    break
+                paused = False
+                for credential in batch:
+                    await semaphore.acquire()
+                    if circuit_breakers.any_open():
+                        semaphore.release()
+                        paused = True
+                        break
+                    task = asyncio.create_task(check(credential))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    total_count += 1
+                if paused:
+                    logger.warning(
+                        "Upstream circuit open, pausing dispatch of remaining credentials"
+                    )
+                    break
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            await AsyncIRCCAgentFactory.close_all()
+
         logger.info(f"Status check completed: {success_count}/{total_count} successful")
         return success_count, total_count
 
-    def _make_ircc_request(self, credential: IRCCCredential) -> ApplicationRecord:
-        """Send request to IRCC website"""
+    def _check_credential_isolated(
+        self, credential: IRCCCredential, on_checked: CheckCallback | None = None
+    ) -> bool:
+        """Check single credential, never letting its failure affect the others"""
+        success = False
+        try:
+            success = self.check_single_credential(credential)
+        except UpstreamUnavailableError as e:
+            if self._is_outage(e):
+                # Not a result for this credential, leave it unchecked and retry shortly
+                self._defer_credential(credential, e)
+                return False
+            self._back_off_credential(credential, e)
+        except Exception as e:
+            logger.error(f"Exception occurred while checking credential: {str(e)}")
+            logger.error(traceback.format_exc())
+        self._notify_checked(on_checked, credential, success)
+        return success
+
+    async def _check_credential_isolated_async(
+        self, credential: IRCCCredential, on_checked: CheckCallback | None = None
+    ) -> bool:
+        """Async counterpart of _check_credential_isolated"""
+        success = False
+        try:
+            success = await self.check_single_credential_async(credential)
+        except UpstreamUnavailableError as e:
+            if self._is_outage(e):
+                await asyncio.to_thread(self._defer_credential, credential, e)
+                return False
+            await asyncio.to_thread(self._back_off_credential, credential, e)
+        except Exception as e:
+            logger.error(f"Exception occurred while checking credential: {str(e)}")
+            logger.error(traceback.format_exc())
+        await asyncio.to_thread(self._notify_checked, on_checked, credential, success)
+        return success
+
+    @staticmethod
+    def _is_outage(error: UpstreamUnavailableError) -> bool:
+        """Check if an upstream error is an outage rather than this credential's failure
+
+        Breakers count failures across the whole endpoint, so while they stay
+        closed a failing request may be specific to the credential.
+        """
+        return isinstance(error, CircuitOpenError) or circuit_breakers.any_open()
+
+    def _back_off_credential(
+        self, credential: IRCCCredential, error: UpstreamUnavailableError
+    ):
+        """Apply the credential's retry backoff after an upstream error the circuit tolerated"""
+        logger.warning(
+            f"Upstream error for user {credential.ircc_username} with circuit closed, backing off: {str(error)}"
+        )
+        try:
+            credential.update_retry_info(success=False)
+        except Exception as e:
+            logger.error(f"Failed to update retry info: {str(e)}")
+
+    def _defer_credential(
+        self, credential: IRCCCredential, error: UpstreamUnavailableError
+    ):
+        """Reschedule a credential whose check hit an upstream outage"""
+        delay = max(error.retry_after, Config.CIRCUIT_BREAKER_OPEN_SECONDS)
+        logger.warning(
+            f"Upstream unavailable for user {credential.ircc_username}, retrying in {delay:.0f}s: {str(error)}"
+        )
+        try:
+            credential.schedule_next_check(
+                datetime.now(timezone.utc) + timedelta(seconds=delay)
+            )
+        except Exception as e:
+            logger.error(f"Failed to reschedule credential: {str(e)}")
+
+    def _notify_checked(
+        self,
+        on_checked: CheckCallback | None,
+        credential: IRCCCredential,
+        success: bool,
+    ):
+        """Report a finished check, e.g. to checkpoint run progress"""
+        if on_checked is None:
+            return
+        try:
+            on_checked(credential, success)
+        except Exception as e:
+            logger.error(f"Failed to record check result: {str(e)}")
+
+    def _make_ircc_request(self, credential: IRCCCredential) -> dict:
+        """Send request to IRCC website, returns raw application details"""
         try:
             ircc_agent = IRCCAgentFactory.get_ircc_agent(credential.application_type)
 
@@ -196,17 +621,6 @@ class IRCCChecker:
                     f"Application number is not set for user {credential.ircc_username}"
                 )
 
-                # Check if retry is needed
-                current_time = datetime.now(timezone.utc)
-                if (
-                    credential.next_retry_time
-                    and current_time < credential.next_retry_time
-                ):
-                    logger.info(
-                        f"Skipping retry for user {credential.ircc_username}, next retry at {credential.next_retry_time}"
-                    )
-                    return False
-
                 try:
                     application_summary = ircc_agent.get_application_summary(credential)
                     if application_summary:
@@ -217,7 +631,12 @@ class IRCCChecker:
                         credential.update_retry_info(
                             success=True
                         )  # Reset retry info on success
-                        return ircc_agent.get_application_details(credential)
+                        return ircc_agent.get_application_details_response(
+                            credential
+                        )
+                except UpstreamUnavailableError:
+                    # Outage is not the credential's fault, keep its retry state
+                    raise
                 except Exception as e:
                     logger.warning(
                         f"Failed to get application summary for user {credential.ircc_username}: {str(e)}"
@@ -230,12 +649,14 @@ class IRCCChecker:
 
             # Get application details
             try:
-                application_details = ircc_agent.get_application_details(credential)
-                if application_details:
+                response = ircc_agent.get_application_details_response(credential)
+                if response:
                     credential.update_retry_info(
                         success=True
                     )  # Reset retry info on successful connection
-                return application_details
+                return response
+            except UpstreamUnavailableError:
+                raise
             except Exception as e:
                 logger.warning(
                     f"Failed to get application details for user {credential.ircc_username}: {str(e)}"
@@ -246,6 +667,8 @@ class IRCCChecker:
                 )  # Update retry info on failure
                 raise
 
+        except UpstreamUnavailableError:
+            raise
         except requests.exceptions.Timeout:
             raise Exception("Request timeout, please try again later")
         except requests.exceptions.RequestException as e:
@@ -253,6 +676,77 @@ class IRCCChecker:
         except Exception as e:
             raise Exception(f"Error occurred while checking status: {str(e)}")
 
+    async def _make_ircc_request_async(self, credential: IRCCCredential) -> dict:
+        """Send request to IRCC website without blocking the event loop"""
+        try:
+            ircc_agent = AsyncIRCCAgentFactory.get_ircc_agent(
+                credential.application_type
+            )
+
+            if credential.application_number is None:
+                logger.warning(
+                    f"Application number is not set for user {credential.ircc_username}"
+                )
+
+                try:
+                    application_summary = await ircc_agent.get_application_summary(
+                        credential
+                    )
+                    if application_summary:
+                        credential.application_number = application_summary[
+                            0
+                        ].application_number
+                        await asyncio.to_thread(credential.save)
+                        await asyncio.to_thread(
+                            credential.update_retry_info, success=True
+                        )  # Reset retry info on success
+                        return await ircc_agent.get_application_details_response(
+                            credential
+                        )
+                except UpstreamUnavailableError:
+                    # Outage is not the credential's fault, keep its retry state
+                    raise
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to get application summary for user {credential.ircc_username}: {str(e)}"
+                    )
+                    logger.error(traceback.format_exc())
+                    await asyncio.to_thread(
+                        credential.update_retry_info, success=False
+                    )  # Update retry info on failure
+                    return False
+
+            # Get application details
+            try:
+                response = await ircc_agent.get_application_details_response(
+                    credential
+                )
+                if response:
+                    await asyncio.to_thread(
+                        credential.update_retry_info, success=True
+                    )  # Reset retry info on successful connection
+                return response
+            except UpstreamUnavailableError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Failed to get application details for user {credential.ircc_username}: {str(e)}"
+                )
+                logger.error(traceback.format_exc())
+                await asyncio.to_thread(
+                    credential.update_retry_info, success=False
+                )  # Update retry info on failure
+                raise
+
+        except UpstreamUnavailableError:
+            raise
+        except asyncio.TimeoutError:
+            raise Exception("Request timeout, please try again later")
+        except aiohttp.ClientError as e:
+            raise Exception(f"Network request error: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Error occurred while checking status: {str(e)}")
+
     def _status_changed(
         self, credential: IRCCCredential, new_status: str, new_timestamp: int
     ):
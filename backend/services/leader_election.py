@@ -0,0 +1,74 @@
+"""MongoDB-backed leader election so only one process runs the scheduled checks."""
+
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+from models.database import db_instance
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    def __init__(self, name: str, owner_id: str, ttl_seconds: int):
+        self.name = name
+        self.owner_id = owner_id
+        self.ttl_seconds = ttl_seconds
+        self.is_leader = False
+
+    def try_acquire(self) -> bool:
+        """Acquire or renew leadership, returns whether this process is leader"""
+        collection = db_instance.get_collection('scheduler_locks')
+        now = datetime.now(timezone.utc)
+
+        try:
+            # Matches only if we already hold the lock or it expired,
+            # otherwise the upsert collides with the current leader's document
+            collection.update_one(
+                {
+                    '_id': self.name,
+                    '$or': [
+                        {'owner': self.owner_id},
+                        {'expires_at': {'$lte': now}}
+                    ]
+                },
+                {'$set': {
+                    'owner': self.owner_id,
+                    'expires_at': now + timedelta(seconds=self.ttl_seconds),
+                    'heartbeat_at': now
+                }},
+                upsert=True
+            )
+            is_leader = True
+        except DuplicateKeyError:
+            is_leader = False
+
+        if is_leader != self.is_leader:
+            if is_leader:
+                logger.info(f"Acquired scheduler leadership: {self.owner_id}")
+            else:
+                logger.warning(f"Lost scheduler leadership: {self.owner_id}")
+        self.is_leader = is_leader
+        return is_leader
+
+    def release(self):
+        """Give up leadership so another process can take over immediately"""
+        if not self.is_leader:
+            return
+
+        collection = db_instance.get_collection('scheduler_locks')
+        collection.delete_one({'_id': self.name, 'owner': self.owner_id})
+        self.is_leader = False
+        logger.info(f"Released scheduler leadership: {self.owner_id}")
+
+    def get_leader(self) -> str | None:
+        """Get owner ID of the current leader"""
+        collection = db_instance.get_collection('scheduler_locks')
+        lock = collection.find_one({'_id': self.name})
+        if not lock:
+            return None
+        expires_at = lock.get('expires_at')
+        if expires_at and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at and expires_at <= datetime.now(timezone.utc):
+            return None
+        return lock.get('owner')
@@ -3,18 +3,26 @@ from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 import threading
 import atexit
+from services.encryption_migration import encryption_migration
 from services.ircc_checker import ircc_checker
+from services.leader_election import LeaderElection
+from utils.ircc_agent import IRCCAgentFactory
 from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
 class TaskScheduler:
-    def __init__(self):
+    def __init__(self, use_leader_election: bool = Config.SCHEDULER_LEADER_ELECTION):
         self.scheduler = BackgroundScheduler()
         self.is_running = False
         self.worker_thread = None
         self.stop_event = threading.Event()
+        # Only the elected process runs scheduled checks when several share the database
+        self.leader_election = (
+            LeaderElection('ircc_scheduler', ircc_checker.worker_id, Config.SCHEDULER_LEADER_TTL_SECONDS)
+            if use_leader_election else None
+        )
         
         # Register cleanup function for program exit
         atexit.register(self.shutdown)
@@ -23,13 +31,25 @@ class TaskScheduler:
         """Start scheduler"""
         if not self.is_running:
             try:
-                # Add scheduled task - check IRCC status every 10 minutes
+                # Add scheduled task - dispatch credentials whose next check is due
                 self.scheduler.add_job(
                     func=self._check_ircc_status_job,
-                    trigger=IntervalTrigger(minutes=Config.CHECK_INTERVAL_MINUTES),
+                    trigger=IntervalTrigger(seconds=Config.CHECK_POLL_SECONDS),
                     id='ircc_status_check',
                     name='IRCC Status Check Task',
-                    replace_existing=True
+                    replace_existing=True,
+                    coalesce=True
+                )
+                
+                # Renew IRCC tokens before they expire; every process runs this job and
+                # refresh claims make sure each stored token is renewed by only one of them
+                self.scheduler.add_job(
+                    func=self._refresh_tokens_job,
+                    trigger=IntervalTrigger(seconds=Config.TOKEN_REFRESH_POLL_SECONDS),
+                    id='ircc_token_refresh',
+                    name='IRCC Token Refresh Task',
+                    replace_existing=True,
+                    coalesce=True
                 )
                 
                 # Start scheduler
@@ -39,7 +59,14 @@ class TaskScheduler:
                 # Start background worker thread
                 self.start_worker_thread()
                 
-                logger.info(f"Task scheduler started, check interval: {Config.CHECK_INTERVAL_MINUTES} minutes")
+                # Try to become leader before the first check
+                self._renew_leadership()
+                
+                # Updates only apply to unchanged passwords, so concurrent runs in workers are harmless
+                if Config.ENCRYPTION_MIGRATE_ON_START and self.is_leader():
+                    self.add_one_time_job(encryption_migration.run)
+                
+                logger.info(f"Task scheduler started, check interval: {Config.CHECK_INTERVAL_MINUTES} minutes, poll interval: {Config.CHECK_POLL_SECONDS} seconds")
                 
                 # Execute check immediately once
                 self._check_ircc_status_job()
@@ -57,6 +84,10 @@ class TaskScheduler:
                 # Stop worker thread
                 self.stop_worker_thread()
                 
+                # Hand over leadership to another process
+                if self.leader_election:
+                    self.leader_election.release()
+                
                 logger.info("Task scheduler stopped")
             except Exception as e:
                 logger.error(f"Failed to stop scheduler: {str(e)}")
@@ -89,6 +120,9 @@ class TaskScheduler:
                 # Other tasks that need to be executed in background can be added here
                 # Currently main checking tasks are handled by scheduler
                 
+                # Heartbeat the leader lock, or take over from a dead leader
+                self._renew_leadership()
+                
                 # Wait 10 seconds before next loop
                 if self.stop_event.wait(timeout=10):
                     break
@@ -101,23 +135,51 @@ class TaskScheduler:
         
         logger.info("Worker thread exited")
     
+    def _renew_leadership(self):
+        """Acquire or renew scheduler leadership"""
+        if self.leader_election:
+            try:
+                self.leader_election.try_acquire()
+            except Exception as e:
+                logger.error(f"Failed to renew scheduler leadership: {str(e)}")
+                self.leader_election.is_leader = False
+    
+    def is_leader(self) -> bool:
+        """Check if this process should run scheduled checks"""
+        return self.leader_election is None or self.leader_election.is_leader
+    
     def _check_ircc_status_job(self):
         """IRCC status check task"""
+        if not self.is_leader():
+            logger.debug("Skipping IRCC status check task, not the scheduler leader")
+            return
+        
         try:
-            logger.info("Starting IRCC status check task")
+            logger.debug("Starting IRCC status check task")
             start_time = datetime.now()
             
-            # Execute status check
-            success_count, total_count = ircc_checker.check_all_credentials()
+            # Execute status check for credentials that are due
+            success_count, total_count = ircc_checker.check_due_credentials()
             
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
             
-            logger.info(f"IRCC status check task completed - Duration: {duration:.2f}s, Success: {success_count}/{total_count}")
+            if total_count:
+                logger.info(f"IRCC status check task completed - Duration: {duration:.2f}s, Success: {success_count}/{total_count}")
+            
+            # Finish a full check run interrupted by a restart or crash
+            ircc_checker.resume_check_run()
             
         except Exception as e:
             logger.error(f"Error occurred during IRCC status check task: {str(e)}")
     
+    def _refresh_tokens_job(self):
+        """IRCC token refresh task"""
+        try:
+            IRCCAgentFactory.refresh_expiring_tokens()
+        except Exception as e:
+            logger.error(f"Error occurred during IRCC token refresh task: {str(e)}")
+    
     def add_one_time_job(self, func, *args, **kwargs):
         """Add one-time task"""
         try:
@@ -150,6 +212,7 @@ class TaskScheduler:
         
         return {
             'is_running': self.is_running,
+            'is_leader': self.is_leader(),
             'worker_thread_alive': self.worker_thread.is_alive() if self.worker_thread else False,
             'jobs': job_info,
             'total_jobs': len(jobs)
@@ -0,0 +1,116 @@
+"""In-memory stand-in for the few pymongo collection methods the models use."""
+
+import copy
+from types import SimpleNamespace
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+def matches(document: dict, query: dict) -> bool:
+    """Evaluate the query operators used by the models against a document"""
+    for field, condition in query.items():
+        if field in ('$and', '$or'):
+            results = [matches(document, sub_query) for sub_query in condition]
+            if not (all(results) if field == '$and' else any(results)):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(field)
+            for operator, operand in condition.items():
+                if operator == '$lte' and not (value is not None and value <= operand):
+                    return False
+                if operator == '$gt' and not (value is not None and value > operand):
+                    return False
+                if operator == '$in' and value not in operand:
+                    return False
+                if operator == '$ne' and value == operand:
+                    return False
+        elif document.get(field) != condition:
+            return False
+    return True
+
+
+class FakeCursor(list):
+    def close(self):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, documents: list[dict] | None = None, unique_indexes: list[tuple] | None = None):
+        self.documents = {document['_id']: document for document in documents or []}
+        # (fields, partial filter) pairs enforced on insert
+        self.unique_indexes = unique_indexes or []
+
+    def _check_unique(self, document: dict):
+        for fields, partial_filter in self.unique_indexes:
+            if not matches(document, partial_filter):
+                continue
+            values = [document.get(field) for field in fields]
+            for existing in self._find(partial_filter):
+                if [existing.get(field) for field in fields] == values:
+                    raise DuplicateKeyError(f"duplicate key for {', '.join(fields)}")
+
+    def _find(self, query: dict, sort: list | None = None) -> list[dict]:
+        found = [document for document in self.documents.values() if matches(document, query)]
+        for field, direction in reversed(sort or []):
+            # MongoDB sorts missing and null values first
+            found.sort(
+                key=lambda document: (document.get(field) is not None, document.get(field) or 0),
+                reverse=direction < 0,
+            )
+        return found
+
+    @staticmethod
+    def _apply(document: dict, update: dict):
+        document.update(update.get('$set', {}))
+        for field, amount in update.get('$inc', {}).items():
+            document[field] = document.get(field, 0) + amount
+
+    def find(self, query: dict, projection=None, batch_size=None) -> FakeCursor:
+        return FakeCursor(copy.deepcopy(self._find(query)))
+
+    def find_one(self, query: dict) -> dict | None:
+        found = self._find(query)
+        return copy.deepcopy(found[0]) if found else None
+
+    def count_documents(self, query: dict, limit: int = 0) -> int:
+        count = len(self._find(query))
+        return min(count, limit) if limit else count
+
+    def insert_one(self, document: dict):
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError("duplicate _id")
+        self._check_unique(document)
+        self.documents[document['_id']] = copy.deepcopy(document)
+        return SimpleNamespace(inserted_id=document['_id'])
+
+    def find_one_and_update(self, query, update, sort=None, return_document=ReturnDocument.BEFORE):
+        found = self._find(query, sort)
+        if not found:
+            return None
+        before = copy.deepcopy(found[0])
+        self._apply(found[0], update)
+        return copy.deepcopy(found[0]) if return_document == ReturnDocument.AFTER else before
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False):
+        found = self._find(query)
+        if found:
+            self._apply(found[0], update)
+            return SimpleNamespace(matched_count=1, modified_count=1)
+        if upsert:
+            # Like MongoDB, an upsert on a taken _id collides with the existing document
+            document = {'_id': query['_id']}
+            self._apply(document, update)
+            self.insert_one(document)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+    def update_many(self, query: dict, update: dict):
+        found = self._find(query)
+        for document in found:
+            self._apply(document, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found))
+
+    def delete_one(self, query: dict):
+        found = self._find(query)
+        if found:
+            del self.documents[found[0]['_id']]
+        return SimpleNamespace(deleted_count=len(found[:1]))
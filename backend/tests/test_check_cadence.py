@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from services.check_cadence import CadencePolicies, CadencePolicy
+
+
+class TestCadencePolicy(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.now = datetime(2024, 1, 10, tzinfo=timezone.utc)
+        self.policy = CadencePolicy(min_minutes=10, max_minutes=360, idle_ratio=0.05)
+
+    def test_unknown_activity_uses_minimum(self):
+        """Test applications without activity are checked at the minimum interval"""
+        self.assertEqual(self.policy.next_interval(None, self.now), timedelta(minutes=10))
+
+    def test_recent_activity_uses_minimum(self):
+        """Test recently changed applications are checked at the minimum interval"""
+        last_activity = self.now - timedelta(hours=1)
+        self.assertEqual(
+            self.policy.next_interval(last_activity, self.now), timedelta(minutes=10)
+        )
+
+    def test_idle_application_backs_off(self):
+        """Test interval grows with idle time"""
+        last_activity = self.now - timedelta(days=1)
+        self.assertEqual(
+            self.policy.next_interval(last_activity, self.now), timedelta(minutes=72)
+        )
+
+    def test_dormant_application_capped(self):
+        """Test interval never exceeds the ceiling"""
+        last_activity = self.now - timedelta(days=60)
+        self.assertEqual(
+            self.policy.next_interval(last_activity, self.now), timedelta(minutes=360)
+        )
+
+
+class TestCadencePolicies(unittest.TestCase):
+    def test_type_overrides(self):
+        """Test per application type overrides"""
+        default_policy = CadencePolicy(10, 360, 0.05)
+        policies = CadencePolicies(
+            default_policy,
+            CadencePolicies.parse_type_policies(
+                "citizen=5:120, immigrant=30:720:0.1", default_policy
+            ),
+        )
+
+        citizen = policies.for_type("citizen")
+        self.assertEqual(
+            (citizen.min_minutes, citizen.max_minutes, citizen.idle_ratio),
+            (5, 120, 0.05),
+        )
+        immigrant = policies.for_type("immigrant")
+        self.assertEqual(
+            (immigrant.min_minutes, immigrant.max_minutes, immigrant.idle_ratio),
+            (30, 720, 0.1),
+        )
+        self.assertIs(policies.for_type("other"), default_policy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+from datetime import timedelta
+from unittest import mock
+from utils.async_ircc_agent import AsyncIRCCCitizenAgent
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, UpstreamUnavailableError
+from utils.ircc_agent import IRCCCitizenAgent
+from utils.token_store import TokenStore
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.now = 1000.0
+        patcher = mock.patch('utils.circuit_breaker.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(
+            'https://api.example.com',
+            failure_rate_threshold=0.5,
+            minimum_requests=4,
+            window_seconds=60,
+            open_seconds=30,
+            half_open_probes=2,
+        )
+
+    def test_opens_on_failure_rate(self):
+        """Test circuit opens only after enough requests fail"""
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    def test_old_failures_leave_window(self):
+        """Test failures outside the window do not count"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.now += 61
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_half_open_probes(self):
+        """Test probes close the circuit when they succeed and reopen it on failure"""
+        for _ in range(4):
+            self.breaker.record_failure()
+        self.now += 30
+
+        self.assertTrue(self.breaker.allow_request())
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.now += 30
+        self.assertTrue(self.breaker.allow_request())
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestCircuitBreakerRegistry(unittest.TestCase):
+    def test_endpoints_are_independent(self):
+        """Test an open circuit only rejects requests to its own endpoint"""
+        registry = CircuitBreakerRegistry(0.5, 1, 60, 30, 1)
+        registry.record_failure('https://cognito.example.com/')
+
+        with self.assertRaises(UpstreamUnavailableError):
+            registry.before_request('https://cognito.example.com/')
+        registry.before_request('https://api.example.com/user')
+        self.assertTrue(registry.any_open())
+
+
+class TestVerifyCredentialsDuringOutage(unittest.TestCase):
+    def make_agent(self, agent_class):
+        agent = agent_class()
+        agent.token_store = TokenStore(
+            expiry_margin=timedelta(seconds=60), default_ttl=timedelta(minutes=50)
+        )
+        return agent
+
+    def test_outage_reports_unverified(self):
+        """Test a Cognito outage makes verification fail instead of raising"""
+        agent = self.make_agent(IRCCCitizenAgent)
+        with mock.patch.object(
+            agent, '_initiate_auth', side_effect=UpstreamUnavailableError('Cognito request failed: 503')
+        ):
+            self.assertFalse(agent.verify_ircc_credentials('user', 'name', 'password'))
+
+    def test_outage_reports_unverified_async(self):
+        """Test the async agent handles a Cognito outage the same way"""
+        agent = self.make_agent(AsyncIRCCCitizenAgent)
+        with mock.patch.object(
+            agent, '_initiate_auth', side_effect=UpstreamUnavailableError('Cognito request failed: 503')
+        ):
+            self.assertFalse(
+                asyncio.run(agent.verify_ircc_credentials('user', 'name', 'password'))
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
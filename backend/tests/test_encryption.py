@@ -0,0 +1,134 @@
+import unittest
+from unittest import mock
+from utils.encryption import EncryptionManager, derive_legacy_key
+
+
+class TestVersionedEncryption(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.manager = EncryptionManager()
+        self.salt = self.manager.generate_salt()
+
+    def test_round_trip_without_pbkdf2(self):
+        """Test the current format never runs the per-salt key derivation"""
+        with mock.patch.object(self.manager, '_get_or_create_key') as derive:
+            encrypted = self.manager.encrypt(self.salt, "secret")
+            self.assertEqual(self.manager.decrypt(self.salt, encrypted), "secret")
+        derive.assert_not_called()
+        self.assertTrue(encrypted.startswith(self.manager.current_prefix))
+        self.assertFalse(self.manager.needs_reencryption(encrypted))
+
+    def test_legacy_ciphertext_still_decrypts(self):
+        """Test both formats decrypt side by side"""
+        legacy = self.manager._encrypt_legacy(self.salt, "secret")
+        self.assertTrue(self.manager.needs_reencryption(legacy))
+        self.assertEqual(self.manager.decrypt(self.salt, legacy), "secret")
+
+    def test_salt_is_authenticated(self):
+        """Test a ciphertext cannot be moved to another record"""
+        encrypted = self.manager.encrypt(self.salt, "secret")
+        with self.assertRaises(Exception):
+            self.manager.decrypt(self.manager.generate_salt(), encrypted)
+
+
+class TestPreviousKeys(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        with mock.patch('utils.encryption.Config.ENCRYPTION_KEY', 'old-key'):
+            self.old_manager = EncryptionManager()
+        with mock.patch('utils.encryption.Config.ENCRYPTION_KEY', 'new-key'), \
+                mock.patch('utils.encryption.Config.ENCRYPTION_PREVIOUS_KEYS', 'old-key'):
+            self.manager = EncryptionManager()
+        self.salt = self.manager.generate_salt()
+
+    def test_previous_key_decrypts_both_formats(self):
+        """Test data encrypted with a previous key stays readable during rotation"""
+        for encrypted in (
+            self.old_manager.encrypt(self.salt, "secret"),
+            self.old_manager._encrypt_legacy(self.salt, "secret"),
+        ):
+            self.assertTrue(self.manager.needs_reencryption(encrypted))
+            self.assertEqual(self.manager.decrypt(self.salt, encrypted), "secret")
+
+    def test_new_key_is_used_for_encryption(self):
+        """Test new ciphertexts are unreadable with only the previous key"""
+        encrypted = self.manager.encrypt(self.salt, "secret")
+        self.assertFalse(self.manager.needs_reencryption(encrypted))
+        with self.assertRaises(Exception):
+            self.old_manager.decrypt(self.salt, encrypted)
+
+
+    def test_legacy_previous_key_is_derived_once(self):
+        """Test old-key legacy data costs one derivation and caches only the matching key"""
+        legacy = self.old_manager._encrypt_legacy(self.salt, "secret")
+        with mock.patch('utils.encryption.derive_legacy_key', wraps=derive_legacy_key) as derive:
+            self.assertEqual(self.manager.decrypt(self.salt, legacy), "secret")
+            self.assertEqual(self.manager.decrypt(self.salt, legacy), "secret")
+        self.assertEqual(derive.call_count, 1)
+        self.assertEqual(list(self.manager._fernets), [(self.old_manager.key_id, self.salt)])
+
+    def test_prederive_caches_previous_key(self):
+        """Test pre-derivation finds the key legacy data was encrypted with"""
+        legacy = self.old_manager._encrypt_legacy(self.salt, "secret")
+        self.assertEqual(self.manager.prederive_keys([(self.salt, legacy)]), 1)
+        self.assertEqual(list(self.manager._fernets), [(self.old_manager.key_id, self.salt)])
+
+
+class TestEncryptionKeyCache(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.manager = EncryptionManager(key_cache_size=2)
+        self.manager.write_version = 1
+        self.salt = self.manager.generate_salt()
+
+    def test_round_trip_derives_key_once(self):
+        """Test repeat encrypt and decrypt with a salt reuse the derived key"""
+        with mock.patch.object(
+            self.manager, '_get_or_create_key', wraps=self.manager._get_or_create_key
+        ) as derive:
+            encrypted = self.manager.encrypt(self.salt, "secret")
+            self.assertEqual(self.manager.decrypt(self.salt, encrypted), "secret")
+            self.assertEqual(self.manager.decrypt(self.salt, encrypted), "secret")
+        self.assertEqual(derive.call_count, 1)
+
+    def test_cached_key_matches_fresh_manager(self):
+        """Test caching does not change the stored format"""
+        encrypted = self.manager.encrypt(self.salt, "secret")
+        self.assertEqual(EncryptionManager(key_cache_size=0).decrypt(self.salt, encrypted), "secret")
+
+    def test_least_recently_used_key_is_evicted(self):
+        """Test cache size bound evicts the least recently used salt"""
+        for salt in ("salt-a", "salt-b", "salt-a"):
+            self.manager.encrypt(salt, "secret")
+        self.manager.encrypt("salt-c", "secret")
+        self.assertEqual([salt for _, salt in self.manager._fernets], ["salt-a", "salt-c"])
+
+
+class TestDecryptMany(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.manager = EncryptionManager(key_cache_size=100)
+        self.manager.kdf_workers = 2
+        self.items = []
+        for index in range(10):
+            salt = self.manager.generate_salt()
+            self.items.append((salt, self.manager._encrypt_legacy(salt, f"secret-{index}")))
+        salt = self.manager.generate_salt()
+        self.items.append((salt, self.manager.encrypt(salt, "current")))
+        self.manager.clear_key_cache()
+
+    def tearDown(self):
+        """Stop key derivation processes"""
+        self.manager.shutdown()
+
+    def test_decrypt_many_derives_legacy_keys_in_pool(self):
+        """Test legacy keys are derived once for the batch and both formats decrypt"""
+        with mock.patch.object(self.manager, '_get_or_create_key') as derive:
+            plaintexts = self.manager.decrypt_many(self.items)
+        derive.assert_not_called()
+        self.assertEqual(plaintexts, [f"secret-{index}" for index in range(10)] + ["current"])
+        self.assertEqual(len(self.manager._fernets), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
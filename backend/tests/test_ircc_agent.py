@@ -1,8 +1,12 @@
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
 from services.ircc_checker import IRCCChecker
 from models.application_records import ApplicationRecord
+from utils.ircc_agent import IRCCCitizenAgent
+from utils.token_store import TokenStore
 class TestCompareApplicationDetails(unittest.TestCase):
     def setUp(self):
         """Setup test data"""
@@ -134,5 +138,62 @@ class TestCompareApplicationDetails(unittest.TestCase):
         ]
         self.assertEqual(len(order_changes), 2)
 
+
+class TestTokenAcquisition(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.agent = IRCCCitizenAgent()
+        self.agent.token_store = TokenStore(
+            expiry_margin=timedelta(seconds=60), default_ttl=timedelta(minutes=50)
+        )
+        self.get_password = MagicMock(return_value='password')
+
+    def test_stored_token_skips_password_decrypt(self):
+        """Test the password provider is not called on a token store hit"""
+        self.agent.token_store.put(('user', 'name'), 'stored-token')
+        token = self.agent._get_token('user', 'name', self.get_password)
+        self.assertEqual(token, 'stored-token')
+        self.get_password.assert_not_called()
+
+    def test_store_miss_logs_in_with_password(self):
+        """Test the password provider is called when Cognito must be asked"""
+        with patch.object(self.agent, '_login', return_value='new-token') as login:
+            token = self.agent._get_token('user', 'name', self.get_password)
+        self.assertEqual(token, 'new-token')
+        login.assert_called_once_with(('user', 'name'), 'name', 'password')
+
+    def test_check_joining_background_refresh_gets_token(self):
+        """Test a check that joins an in-flight refresh receives the IdToken"""
+        key = ('user', 'name')
+        entry = MagicMock(refresh_token='refresh-token')
+        started = threading.Event()
+        release = threading.Event()
+
+        def renew(key, refresh_token):
+            started.set()
+            release.wait(5)
+            return 'renewed-token'
+
+        tokens = []
+        with patch.object(self.agent.token_store, 'get_expiring', return_value=[(key, entry)]), \
+                patch.object(self.agent.token_store, 'get_entry', return_value=entry), \
+                patch.object(self.agent, '_renew_token', side_effect=renew), \
+                patch.object(self.agent, '_login') as login:
+            refresher = threading.Thread(target=self.agent.refresh_expiring_tokens)
+            refresher.start()
+            self.assertTrue(started.wait(5))
+            check = threading.Thread(
+                target=lambda: tokens.append(self.agent._get_token('user', 'name', self.get_password))
+            )
+            check.start()
+            time.sleep(0.1)
+            release.set()
+            refresher.join()
+            check.join()
+
+        self.assertEqual(tokens, ['renewed-token'])
+        login.assert_not_called()
+
+
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()
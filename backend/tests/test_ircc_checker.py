@@ -0,0 +1,260 @@
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from bson import ObjectId
+from models.check_run import CheckRun
+from models.database import db_instance
+from models.ircc_credential import IRCCCredential
+from services.ircc_checker import IRCCChecker
+from utils.circuit_breaker import CircuitOpenError, UpstreamUnavailableError
+from fake_collection import FakeCollection
+
+
+def make_credential(**fields) -> IRCCCredential:
+    credential = IRCCCredential("user@example.com", "ircc-user", "salt", "encrypted", "citizen")
+    for name, value in fields.items():
+        setattr(credential, name, value)
+    return credential
+
+
+class TestMakeIRCCRequest(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.checker = IRCCChecker()
+        self.agent = mock.MagicMock()
+        patcher = mock.patch(
+            'services.ircc_checker.IRCCAgentFactory.get_ircc_agent', return_value=self.agent
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_manual_refresh_during_retry_backoff(self):
+        """Test a due credential is checked even while its retry backoff runs"""
+        credential = make_credential(
+            application_number=None,
+            retry_count=2,
+            next_retry_time=datetime.now(timezone.utc) + timedelta(hours=1),
+        )
+        self.agent.get_application_summary.return_value = [mock.Mock(application_number="C123")]
+        self.agent.get_application_details_response.return_value = {"status": "inProgress"}
+
+        with mock.patch.object(credential, 'save'), mock.patch.object(credential, 'update_retry_info'):
+            response = self.checker._make_ircc_request(credential)
+
+        self.assertEqual(response, {"status": "inProgress"})
+        self.assertEqual(credential.application_number, "C123")
+        self.agent.get_application_summary.assert_called_once_with(credential)
+
+
+class TestCheckCredentialsPool(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.checker = IRCCChecker()
+        self.lock = threading.Lock()
+        self.finished = 0
+        self.in_flight = []
+
+    def check(self, credential: IRCCCredential) -> bool:
+        time.sleep(0.005)
+        with self.lock:
+            self.finished += 1
+        if credential.ircc_username == "fails":
+            raise ValueError("login failed")
+        return credential.ircc_username != "unavailable"
+
+    def credentials(self, usernames):
+        for pulled, username in enumerate(usernames):
+            with self.lock:
+                self.in_flight.append(pulled - self.finished)
+            yield make_credential(ircc_username=username)
+
+    def test_counts_every_outcome(self):
+        """Test successes, failures and exceptions are all counted once"""
+        usernames = ["ok"] * 20 + ["unavailable"] * 5 + ["fails"] * 5
+        with mock.patch.object(self.checker, 'check_single_credential', side_effect=self.check):
+            result = self.checker.check_credentials(self.credentials(usernames), max_workers=3)
+        self.assertEqual(result, (20, 30))
+        self.assertEqual(self.finished, 30)
+
+    def test_pulls_credentials_as_workers_free_up(self):
+        """Test no more than twice the worker count is dispatched ahead of completion"""
+        with mock.patch.object(self.checker, 'check_single_credential', side_effect=self.check):
+            self.checker.check_credentials(self.credentials(["ok"] * 30), max_workers=3)
+        self.assertLessEqual(max(self.in_flight), 6)
+
+    def test_open_circuit_stops_dispatch(self):
+        """Test remaining credentials are not dispatched while upstream is down"""
+        with mock.patch.object(self.checker, 'check_single_credential', side_effect=self.check), \
+                mock.patch('services.ircc_checker.circuit_breakers.any_open', side_effect=[False, False, True]):
+            result = self.checker.check_credentials(self.credentials(["ok"] * 10), max_workers=3)
+        self.assertEqual(result, (2, 2))
+
+
+class TestUpstreamFailures(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.checker = IRCCChecker()
+        self.credential = make_credential(application_number="C123")
+        self.on_checked = mock.Mock()
+
+    def check(self, error: UpstreamUnavailableError, circuit_open: bool):
+        with mock.patch.object(self.checker, 'check_single_credential', side_effect=error), \
+                mock.patch('services.ircc_checker.circuit_breakers.any_open', return_value=circuit_open), \
+                mock.patch.object(self.credential, 'update_retry_info') as update_retry_info, \
+                mock.patch.object(self.credential, 'schedule_next_check') as schedule_next_check:
+            result = self.checker._check_credential_isolated(self.credential, self.on_checked)
+        self.assertFalse(result)
+        return update_retry_info, schedule_next_check
+
+    def test_server_error_with_closed_circuit_backs_off(self):
+        """Test a credential whose own requests fail gets its retry backoff"""
+        update_retry_info, schedule_next_check = self.check(
+            UpstreamUnavailableError("IRCC request failed: 503"), circuit_open=False
+        )
+        update_retry_info.assert_called_once_with(success=False)
+        schedule_next_check.assert_not_called()
+        self.on_checked.assert_called_once_with(self.credential, False)
+
+    def test_open_circuit_defers_without_penalty(self):
+        """Test requests rejected by an open circuit keep the retry state"""
+        update_retry_info, schedule_next_check = self.check(
+            CircuitOpenError("circuit open", retry_after=30), circuit_open=True
+        )
+        update_retry_info.assert_not_called()
+        schedule_next_check.assert_called_once()
+        self.on_checked.assert_not_called()
+
+
+class TestUnchangedResponse(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.checker = IRCCChecker()
+        self.response = {"status": "inProgress", "activities": [{"activity": "language", "status": "completed"}]}
+
+    def test_identical_responses_share_fingerprint(self):
+        """Test key order does not change the fingerprint but content does"""
+        reordered = {"activities": [{"status": "completed", "activity": "language"}], "status": "inProgress"}
+        self.assertEqual(
+            IRCCChecker.fingerprint_response(self.response),
+            IRCCChecker.fingerprint_response(reordered),
+        )
+        self.assertNotEqual(
+            IRCCChecker.fingerprint_response(self.response),
+            IRCCChecker.fingerprint_response({**self.response, "status": "decisionMade"}),
+        )
+
+    def test_unchanged_response_only_touches_last_checked(self):
+        """Test a repeated response skips parsing and persistence"""
+        credential = make_credential(
+            application_number="C123",
+            response_fingerprint=IRCCChecker.fingerprint_response(self.response),
+        )
+        with mock.patch.object(credential, 'touch_last_checked') as touch, \
+                mock.patch.object(self.checker, '_save_application_details') as save, \
+                mock.patch('services.ircc_checker.IRCCAgentFactory.get_ircc_agent') as get_agent:
+            self.checker._process_application_response(credential, self.response)
+
+        touch.assert_called_once()
+        save.assert_not_called()
+        get_agent.assert_not_called()
+
+    def test_changed_response_is_processed(self):
+        """Test a new response is parsed, saved and its fingerprint kept"""
+        credential = make_credential(application_number="C123", response_fingerprint="old")
+        with mock.patch.object(credential, 'touch_last_checked') as touch, \
+                mock.patch.object(self.checker, '_save_application_details') as save, \
+                mock.patch('services.ircc_checker.IRCCAgentFactory.get_ircc_agent'):
+            self.checker._process_application_response(credential, self.response)
+
+        touch.assert_not_called()
+        save.assert_called_once()
+        self.assertEqual(credential.response_fingerprint, IRCCChecker.fingerprint_response(self.response))
+
+
+class TestCheckRun(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.checker = IRCCChecker()
+        self.collections = {
+            'ircc_credentials': FakeCollection(),
+            # Mirrors the single_running_run index
+            'check_runs': FakeCollection(unique_indexes=[(['status'], {'status': 'running'})]),
+        }
+        patcher = mock.patch.object(
+            db_instance, 'get_collection', side_effect=lambda name: self.collections[name]
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.checked = []
+        patcher = mock.patch.object(
+            self.checker, 'check_single_credential',
+            side_effect=lambda credential: self.checked.append(credential.id) or True,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_credential(self, **fields) -> ObjectId:
+        document = {
+            '_id': ObjectId(),
+            'user_id': "user@example.com",
+            'ircc_username': "ircc-user",
+            'application_type': "citizen",
+            'is_active': True,
+            'next_check_at': datetime.now(timezone.utc) + timedelta(hours=1),
+            'lease_owner': None,
+            'lease_expires_at': None,
+            **fields,
+        }
+        self.collections['ircc_credentials'].documents[document['_id']] = document
+        return document['_id']
+
+    def test_full_run_skips_leased_credentials(self):
+        """Test the full run leaves credentials to the checker that leased them"""
+        free = self.add_credential()
+        leased = self.add_credential(
+            lease_owner="other", lease_expires_at=datetime.now(timezone.utc) + timedelta(minutes=5)
+        )
+
+        self.assertEqual(self.checker.check_all_credentials(max_workers=2), (1, 1))
+
+        self.assertEqual(self.checked, [free])
+        documents = self.collections['ircc_credentials'].documents
+        self.assertEqual(documents[leased]['lease_owner'], "other")
+        self.assertIsNone(documents[free]['lease_owner'])
+        self.assertFalse(CheckRun.has_active_run())
+
+    def test_interrupted_run_resumes_where_it_stopped(self):
+        """Test a stale run is taken over and only its unchecked credentials are checked"""
+        credential_ids = [self.add_credential() for _ in range(3)]
+        run = CheckRun.start("crashed")
+        run.record_result(IRCCCredential.find_by_id(credential_ids[0]), True)
+        self.collections['check_runs'].documents[run.run_id]['updated_at'] = (
+            datetime.now(timezone.utc) - timedelta(hours=1)
+        )
+
+        self.assertEqual(self.checker.check_all_credentials(max_workers=2), (3, 3))
+
+        self.assertCountEqual(self.checked, credential_ids[1:])
+        document = self.collections['check_runs'].documents[run.run_id]
+        self.assertEqual(document['owner'], self.checker.worker_id)
+        self.assertEqual(document['status'], 'completed')
+
+    def test_live_run_is_not_taken_over(self):
+        """Test a run still making progress elsewhere is left alone"""
+        self.add_credential()
+        CheckRun.start("other")
+
+        self.assertEqual(self.checker.check_all_credentials(max_workers=2), (0, 0))
+        self.assertEqual(self.checked, [])
+
+    def test_concurrent_starts_run_once(self):
+        """Test only one of two racing full runs starts"""
+        self.assertIsNotNone(CheckRun.start("first"))
+        self.assertIsNone(CheckRun.start("second"))
+        self.assertEqual(len(self.collections['check_runs'].documents), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
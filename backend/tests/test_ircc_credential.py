@@ -0,0 +1,126 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from bson import ObjectId
+from models.ircc_credential import IRCCCredential
+from fake_collection import FakeCollection
+
+
+def make_document(**fields) -> dict:
+    return {
+        '_id': ObjectId(),
+        'user_id': "user@example.com",
+        'ircc_username': "ircc-user",
+        'application_type': "citizen",
+        'is_active': True,
+        'next_check_at': None,
+        'lease_owner': None,
+        'lease_expires_at': None,
+        **fields,
+    }
+
+
+class TestSaveCredential(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.collection = mock.MagicMock()
+        patcher = mock.patch(
+            'models.ircc_credential.db_instance.get_collection', return_value=self.collection
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.credential = IRCCCredential("user@example.com", "ircc-user", "salt", "stale", "citizen")
+        self.collection.find_one.return_value = {'_id': ObjectId()}
+
+    def test_update_keeps_stored_password(self):
+        """Test saving a stale copy does not write back its ciphertext"""
+        self.credential.save()
+        update = self.collection.update_one.call_args[0][1]['$set']
+        self.assertNotIn('salt', update)
+        self.assertNotIn('encrypted_password', update)
+        self.assertEqual(update['ircc_username'], "ircc-user")
+
+    def test_update_with_password(self):
+        """Test a password change is written when requested"""
+        self.credential.save(with_password=True)
+        update = self.collection.update_one.call_args[0][1]['$set']
+        self.assertEqual(update['encrypted_password'], "stale")
+
+    def test_insert_writes_password(self):
+        """Test new credentials are stored with their password"""
+        self.collection.find_one.return_value = None
+        self.credential.save()
+        document = self.collection.insert_one.call_args[0][0]
+        self.assertEqual(document['encrypted_password'], "stale")
+
+
+class TestCredentialLeases(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.now = datetime.now(timezone.utc)
+        self.lease_until = self.now + timedelta(minutes=5)
+        self.collection = FakeCollection()
+        patcher = mock.patch(
+            'models.ircc_credential.db_instance.get_collection', return_value=self.collection
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add(self, **fields) -> ObjectId:
+        document = make_document(**fields)
+        self.collection.documents[document['_id']] = document
+        return document['_id']
+
+    def test_claim_skips_live_leases_and_reclaims_expired(self):
+        """Test a crashed worker's lease expires and the credential is claimed again"""
+        free = self.add(next_check_at=self.now - timedelta(minutes=1))
+        leased = self.add(lease_owner="other", lease_expires_at=self.now + timedelta(minutes=1))
+        expired = self.add(lease_owner="crashed", lease_expires_at=self.now - timedelta(seconds=1))
+        self.add(next_check_at=self.now + timedelta(hours=1))
+        self.add(is_active=False)
+
+        claimed = IRCCCredential.claim_due_credentials("worker", self.now, self.lease_until, 10)
+
+        self.assertEqual({credential.id for credential in claimed}, {free, expired})
+        for credential_id in (free, expired):
+            self.assertEqual(self.collection.documents[credential_id]['lease_owner'], "worker")
+            self.assertEqual(self.collection.documents[credential_id]['lease_expires_at'], self.lease_until)
+        self.assertEqual(self.collection.documents[leased]['lease_owner'], "other")
+
+    def test_claimed_credentials_are_not_claimed_twice(self):
+        """Test concurrent checkers split the due credentials"""
+        for _ in range(3):
+            self.add()
+
+        first = IRCCCredential.claim_due_credentials("first", self.now, self.lease_until, 2)
+        second = IRCCCredential.claim_due_credentials("second", self.now, self.lease_until, 2)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({credential.id for credential in first} & {credential.id for credential in second})
+
+    def test_release_clears_leases_and_pushes_unscheduled(self):
+        """Test released credentials keep a newer schedule and are never claimed straight back"""
+        next_check_at = self.now + timedelta(hours=2)
+        fallback = self.now + timedelta(minutes=30)
+        unchecked = self.add(lease_owner="worker", lease_expires_at=self.lease_until)
+        checked = self.add(next_check_at=next_check_at, lease_owner="worker", lease_expires_at=self.lease_until)
+        taken_over = self.add(lease_owner="other", lease_expires_at=self.lease_until)
+
+        IRCCCredential.release_leases("worker", [unchecked, checked, taken_over], fallback)
+
+        documents = self.collection.documents
+        self.assertEqual(documents[unchecked]['next_check_at'], fallback)
+        self.assertEqual(documents[checked]['next_check_at'], next_check_at)
+        for credential_id in (unchecked, checked):
+            self.assertIsNone(documents[credential_id]['lease_owner'])
+            self.assertIsNone(documents[credential_id]['lease_expires_at'])
+        self.assertEqual(documents[taken_over]['lease_owner'], "other")
+        self.assertIsNone(documents[taken_over]['next_check_at'])
+        self.assertEqual(
+            IRCCCredential.claim_due_credentials("worker", self.now, self.lease_until, 10), []
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from datetime import datetime, timezone
+from bson import ObjectId
+from flask import Flask, jsonify
+from models.application_records import ActivityStatus
+from utils.json_codec import CodecJSONProvider, JSONCodec
+
+
+class TestJSONCodec(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.value = {
+            "id": ObjectId("64b7f0c2a1b2c3d4e5f60718"),
+            "created_at": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+            "last_checked": datetime(2024, 5, 1, 12, 30, 15, 250000),
+            "status": ActivityStatus.COMPLETED,
+            "name": "Étape",
+        }
+        self.expected = {
+            "id": "64b7f0c2a1b2c3d4e5f60718",
+            "created_at": "2024-05-01T12:30:00+00:00",
+            "last_checked": "2024-05-01T12:30:15.250000+00:00",
+            "status": ActivityStatus.COMPLETED.value,
+            "name": "Étape",
+        }
+
+    def test_backends_encode_the_same(self):
+        """Test both backends handle datetime, ObjectId and Enum identically"""
+        for backend in (JSONCodec.STDLIB, JSONCodec.ORJSON):
+            codec = JSONCodec(backend)
+            with self.subTest(backend=codec.backend):
+                self.assertEqual(codec.loads(codec.dumps(self.value)), self.expected)
+
+    def test_invalid_json_raises_value_error(self):
+        """Test decoding errors are ValueErrors for both backends"""
+        for backend in (JSONCodec.STDLIB, JSONCodec.ORJSON):
+            with self.subTest(backend=backend):
+                with self.assertRaises(ValueError):
+                    JSONCodec(backend).loads(b"<html>")
+
+    def test_flask_provider(self):
+        """Test jsonify encodes values without manual conversion"""
+        app = Flask(__name__)
+        app.json = CodecJSONProvider(app)
+        with app.app_context():
+            response = jsonify(self.value)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.get_json(), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from services.leader_election import LeaderElection
+from fake_collection import FakeCollection
+
+
+class TestLeaderElection(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.collection = FakeCollection()
+        patcher = mock.patch(
+            'services.leader_election.db_instance.get_collection', return_value=self.collection
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.first = LeaderElection('ircc_scheduler', 'first', ttl_seconds=60)
+        self.second = LeaderElection('ircc_scheduler', 'second', ttl_seconds=60)
+
+    def expire_lock(self):
+        self.collection.documents['ircc_scheduler']['expires_at'] = (
+            datetime.now(timezone.utc) - timedelta(seconds=1)
+        )
+
+    def test_first_process_acquires(self):
+        """Test a free lock is acquired"""
+        self.assertTrue(self.first.try_acquire())
+        self.assertEqual(self.first.get_leader(), 'first')
+
+    def test_leader_renews(self):
+        """Test the leader extends its lock on every heartbeat"""
+        self.first.try_acquire()
+        self.collection.documents['ircc_scheduler']['expires_at'] = datetime.now(timezone.utc)
+        self.assertTrue(self.first.try_acquire())
+        self.assertGreater(
+            self.collection.documents['ircc_scheduler']['expires_at'],
+            datetime.now(timezone.utc) + timedelta(seconds=50),
+        )
+
+    def test_live_lock_rejects_other_process(self):
+        """Test the upsert of a second process collides with the leader's lock"""
+        self.first.try_acquire()
+        self.assertFalse(self.second.try_acquire())
+        self.assertFalse(self.second.is_leader)
+        self.assertEqual(self.collection.documents['ircc_scheduler']['owner'], 'first')
+
+    def test_expired_lock_is_taken_over(self):
+        """Test another process takes over once the leader stops renewing"""
+        self.first.try_acquire()
+        self.expire_lock()
+        self.assertIsNone(self.first.get_leader())
+
+        self.assertTrue(self.second.try_acquire())
+        self.assertFalse(self.first.try_acquire())
+        self.assertFalse(self.first.is_leader)
+        self.assertEqual(self.second.get_leader(), 'second')
+
+    def test_release_hands_over_immediately(self):
+        """Test a released lock is acquired without waiting for expiry"""
+        self.first.try_acquire()
+        self.first.release()
+        self.assertFalse(self.first.is_leader)
+        self.assertTrue(self.second.try_acquire())
+
+
+if __name__ == '__main__':
+    unittest.main()
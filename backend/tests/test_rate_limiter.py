@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+from utils.rate_limiter import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_is_free(self):
+        """Test requests within burst do not wait"""
+        bucket = TokenBucket(rate=1, burst=3)
+        self.assertEqual([bucket._reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    def test_requests_over_burst_are_spaced(self):
+        """Test requests over burst wait 1/rate each"""
+        with patch("utils.rate_limiter.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, burst=1)
+            self.assertEqual(bucket._reserve(), 0.0)
+            self.assertAlmostEqual(bucket._reserve(), 0.5)
+            self.assertAlmostEqual(bucket._reserve(), 1.0)
+
+    def test_tokens_refill_over_time(self):
+        """Test tokens refill at the configured rate"""
+        with patch("utils.rate_limiter.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, burst=1)
+            bucket._reserve()
+        with patch("utils.rate_limiter.time.monotonic", return_value=100.5):
+            self.assertEqual(bucket._reserve(), 0.0)
+
+    def test_zero_rate_disables_limit(self):
+        """Test non-positive rate never waits"""
+        bucket = TokenBucket(rate=0, burst=1)
+        self.assertEqual([bucket._reserve() for _ in range(5)], [0.0] * 5)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_bucket_shared_per_host(self):
+        """Test URLs on the same host share one bucket"""
+        limiter = RateLimiter(10, 20)
+        self.assertIs(
+            limiter.get_bucket("https://cognito-idp.ca-central-1.amazonaws.com/"),
+            limiter.get_bucket("https://COGNITO-IDP.ca-central-1.amazonaws.com/x"),
+        )
+        self.assertIsNot(
+            limiter.get_bucket("https://api.tracker-suivi.apps.cic.gc.ca/user"),
+            limiter.get_bucket("https://api.ircc-tracker-suivi.apps.cic.gc.ca/user"),
+        )
+
+    def test_host_overrides(self):
+        """Test per-host limits override the default"""
+        limiter = RateLimiter(
+            10, 20, RateLimiter.parse_host_limits("a.example.com=5:7, b.example.com=3")
+        )
+        bucket = limiter.get_bucket("https://a.example.com/path")
+        self.assertEqual((bucket.rate, bucket.burst), (5.0, 7))
+        bucket = limiter.get_bucket("https://b.example.com/path")
+        self.assertEqual((bucket.rate, bucket.burst), (3.0, 3))
+        bucket = limiter.get_bucket("https://c.example.com/path")
+        self.assertEqual((bucket.rate, bucket.burst), (10, 20))
+
+
+if __name__ == '__main__':
+    unittest.main()
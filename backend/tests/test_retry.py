@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+from utils.circuit_breaker import CircuitOpenError, UpstreamUnavailableError
+from utils.retry import RetryBudget, RetryPolicy
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_budget_limits_retries(self):
+        """Test retries are capped at the ratio of requests"""
+        budget = RetryBudget(ratio=0.5, min_per_second=0, max_balance=1)
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+
+        budget.record_request()
+        self.assertFalse(budget.try_spend())
+        budget.record_request()
+        self.assertTrue(budget.try_spend())
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.policy = RetryPolicy(
+            max_attempts=3,
+            base_delay=0.5,
+            max_delay=5,
+            budget=RetryBudget(ratio=0.1, min_per_second=0, max_balance=10),
+        )
+        patcher = mock.patch('utils.retry.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_transient_failures(self):
+        """Test transient upstream failures are retried until success"""
+        func = mock.Mock(side_effect=[UpstreamUnavailableError('502'), 'ok'])
+        self.assertEqual(self.policy.call(func), 'ok')
+        self.assertEqual(func.call_count, 2)
+        self.assertEqual(self.sleep.call_count, 1)
+
+    def test_gives_up_after_max_attempts(self):
+        """Test the last failure is raised after max attempts"""
+        func = mock.Mock(side_effect=UpstreamUnavailableError('timeout'))
+        with self.assertRaises(UpstreamUnavailableError):
+            self.policy.call(func)
+        self.assertEqual(func.call_count, 3)
+
+    def test_does_not_retry_other_errors(self):
+        """Test open circuits and non-upstream errors are not retried"""
+        for error in (CircuitOpenError('open', 30), ValueError('bad response')):
+            func = mock.Mock(side_effect=error)
+            with self.assertRaises(type(error)):
+                self.policy.call(func)
+            self.assertEqual(func.call_count, 1)
+
+    def test_backoff_is_capped(self):
+        """Test backoff never exceeds the ceiling"""
+        for attempt in range(1, 10):
+            self.assertLessEqual(self.policy.backoff(attempt), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
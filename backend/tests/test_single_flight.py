@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+import unittest
+from utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        """Test concurrent callers with the same key run the function once"""
+        flight = SingleFlight()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'token'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['token'] * 5)
+
+    def test_error_is_shared_and_not_cached(self):
+        """Test an error reaches the caller and the next call runs again"""
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('upstream error')
+
+        with self.assertRaises(ValueError):
+            flight.do('key', fail)
+        self.assertEqual(flight.do('key', lambda: 'token'), 'token')
+
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        """Test concurrent coroutines with the same key await the function once"""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value
+
+        async def run():
+            return await asyncio.gather(
+                flight.do('a', fetch, 'first'),
+                flight.do('a', fetch, 'second'),
+                flight.do('b', fetch, 'other'),
+            )
+
+        self.assertEqual(asyncio.run(run()), ['first', 'first', 'other'])
+        self.assertEqual(calls, ['first', 'other'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import jwt
+from utils.token_store import MongoTokenStore, TokenStore, create_token_store
+
+
+def make_token(expires_in: timedelta) -> str:
+    """Create token with an exp claim"""
+    exp = datetime.now(timezone.utc) + expires_in
+    return jwt.encode({'exp': int(exp.timestamp())}, 'secret', algorithm='HS256')
+
+
+class TestTokenStore(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.store = TokenStore(
+            expiry_margin=timedelta(seconds=60), default_ttl=timedelta(minutes=50)
+        )
+
+    def test_uses_exp_claim(self):
+        """Test tokens are kept until shortly before their exp claim"""
+        token = make_token(timedelta(hours=1))
+        self.store.put(('user', 'name'), token)
+        self.assertEqual(self.store.get(('user', 'name')), token)
+
+        self.store.put(('user', 'other'), make_token(timedelta(seconds=30)))
+        self.assertIsNone(self.store.get(('user', 'other')))
+
+    def test_opaque_token_uses_default_ttl(self):
+        """Test tokens without a readable exp claim fall back to the default TTL"""
+        entry = self.store.put(('user', 'name'), 'opaque-token')
+        self.assertEqual(self.store.get(('user', 'name')), 'opaque-token')
+        self.assertGreater(
+            entry.expires_at, datetime.now(timezone.utc) + timedelta(minutes=49)
+        )
+
+    def test_get_expiring(self):
+        """Test only recently used tokens close to expiry are returned for refresh"""
+        now = datetime.now(timezone.utc)
+        self.store.put(('user', 'fresh'), make_token(timedelta(hours=1)))
+        self.store.put(('user', 'expiring'), make_token(timedelta(minutes=3)))
+        idle = self.store.put(('user', 'idle'), make_token(timedelta(minutes=3)))
+        idle.last_used_at = now - timedelta(hours=2)
+
+        expiring = self.store.get_expiring(timedelta(minutes=5), now - timedelta(hours=1))
+        self.assertEqual([key for key, _ in expiring], [('user', 'expiring')])
+
+
+class TestMongoTokenStore(unittest.TestCase):
+    def setUp(self):
+        """Setup test data"""
+        self.store = MongoTokenStore(
+            'citizen',
+            expiry_margin=timedelta(seconds=60),
+            default_ttl=timedelta(minutes=50),
+            retention=timedelta(days=7),
+        )
+        self.docs = {}
+        self.collection = mock.MagicMock()
+        self.collection.find_one_and_update.side_effect = self.upsert
+        self.collection.find_one.side_effect = lambda query: self.docs.get(query['_id'])
+        patcher = mock.patch.object(MongoTokenStore, '_collection', return_value=self.collection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upsert(self, query, update, upsert, return_document):
+        """Apply $setOnInsert and $set like MongoDB would"""
+        doc = self.docs.get(query['_id'])
+        if doc is None:
+            doc = {'_id': query['_id'], **update['$setOnInsert']}
+        doc.update(update['$set'])
+        self.docs[query['_id']] = doc
+        return doc
+
+    def test_tokens_are_encrypted_at_rest(self):
+        """Test stored values are ciphertexts that round-trip through get"""
+        token = make_token(timedelta(hours=1))
+        self.store.put(('user', 'name'), token, 'refresh-token')
+
+        doc = self.docs['citizen|user|name']
+        self.assertNotIn(token, doc['id_token'])
+        self.assertNotEqual(doc['refresh_token'], 'refresh-token')
+        self.assertEqual(self.store.get(('user', 'name')), token)
+        self.assertEqual(self.store.get_entry(('user', 'name')).refresh_token, 'refresh-token')
+
+    def test_expired_token_is_a_miss(self):
+        """Test tokens close to their exp claim are not returned"""
+        self.store.put(('user', 'name'), make_token(timedelta(seconds=30)))
+        self.assertIsNone(self.store.get(('user', 'name')))
+        self.assertIsNotNone(self.store.get_entry(('user', 'name')))
+
+    def test_unreadable_token_is_a_miss(self):
+        """Test entries encrypted with an unknown key are ignored"""
+        self.store.put(('user', 'name'), make_token(timedelta(hours=1)))
+        self.docs['citizen|user|name']['id_token'] = 'not-a-fernet-token'
+        self.assertIsNone(self.store.get(('user', 'name')))
+
+    def test_get_expiring_returns_only_claimed_entries(self):
+        """Test entries claimed by another process are not refreshed twice"""
+        self.store.put(('user', 'mine'), make_token(timedelta(minutes=3)))
+        self.store.put(('user', 'theirs'), make_token(timedelta(minutes=3)))
+        self.collection.find.return_value = list(self.docs.values())
+        self.collection.update_one.side_effect = [
+            mock.Mock(modified_count=1),
+            mock.Mock(modified_count=0),
+        ]
+
+        now = datetime.now(timezone.utc)
+        expiring = self.store.get_expiring(timedelta(minutes=5), now - timedelta(hours=1))
+
+        self.assertEqual([key for key, _ in expiring], [('user', 'mine')])
+        query = self.collection.find.call_args[0][0]
+        self.assertEqual(query['namespace'], 'citizen')
+
+
+class TestCreateTokenStore(unittest.TestCase):
+    def test_replay_keeps_tokens_in_memory(self):
+        """Test replayed fake tokens are never written to the shared store"""
+        with mock.patch('utils.token_store.Config.TOKEN_STORE_BACKEND', 'mongo'), \
+                mock.patch('utils.token_store.Config.IRCC_CASSETTE_MODE', 'replay'):
+            store = create_token_store('citizen')
+        self.assertIs(type(store), TokenStore)
+
+    def test_mongo_backend(self):
+        """Test the configured backend is used outside replay"""
+        with mock.patch('utils.token_store.Config.TOKEN_STORE_BACKEND', 'mongo'), \
+                mock.patch('utils.token_store.Config.IRCC_CASSETTE_MODE', 'off'):
+            store = create_token_store('citizen')
+        self.assertIsInstance(store, MongoTokenStore)
+
+
+if __name__ == '__main__':
+    unittest.main()
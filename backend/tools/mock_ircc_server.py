@@ -0,0 +1,304 @@
+"""Local stand-in for Cognito and the IRCC tracker APIs, for load and latency testing.
+
+Any username is accepted with any password except "wrong-password". Each
+username owns one application whose history grows every --change-interval
+seconds, so the checker sees status changes over time.
+
+Point the agents at it with:
+
+    IRCC_COGNITO_URL=http://localhost:8085/cognito/
+    IRCC_CITIZEN_API_URL=http://localhost:8085/citizen/user
+    IRCC_IMMIGRANT_API_URL=http://localhost:8085/immigrant/user
+"""
+
+import argparse
+import hashlib
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+import jwt
+from flask import Flask, jsonify, request
+
+TOKEN_SECRET = "mock-ircc-secret"
+REJECTED_PASSWORD = "wrong-password"
+
+CITIZEN_ACTIVITIES = ["language", "background", "residence", "prohibitions", "test", "oath"]
+IMMIGRANT_ACTIVITIES = ["eligibility", "medical", "biometrics", "background", "decision"]
+IMMIGRANT_HISTORY_KEYS = ["Word LTR 01", "Auto E-mail 111", "IMM1017", "Word LTR 29", "Word LTR 28"]
+
+
+class LatencyDistribution:
+    """Response delay in seconds, parsed from a spec such as "lognormal:-3:0.5"
+
+    Supported specs: "none", "fixed:<s>", "uniform:<min>:<max>",
+    "exponential:<mean>" and "lognormal:<mu>:<sigma>".
+    """
+
+    def __init__(self, spec: str):
+        name, *params = spec.split(":")
+        self.name = name
+        self.params = [float(param) for param in params]
+        if name not in ("none", "fixed", "uniform", "exponential", "lognormal"):
+            raise ValueError(f"Invalid latency distribution: {spec}")
+
+    def sample(self) -> float:
+        """Draw one delay"""
+        if self.name == "fixed":
+            return self.params[0]
+        if self.name == "uniform":
+            return random.uniform(self.params[0], self.params[1])
+        if self.name == "exponential":
+            return random.expovariate(1 / self.params[0])
+        if self.name == "lognormal":
+            return random.lognormvariate(self.params[0], self.params[1])
+        return 0.0
+
+
+class Throttle:
+    """Token bucket over all requests, excess requests get a 429"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Take one token if available"""
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class MockApplications:
+    """Deterministic applications per username that advance one step per interval"""
+
+    def __init__(self, change_interval: float, max_steps: int):
+        self.started_at = time.time()
+        self.change_interval = change_interval
+        self.max_steps = max_steps
+
+    @staticmethod
+    def _seed(username: str) -> int:
+        return int(hashlib.sha256(username.encode("utf-8")).hexdigest()[:12], 16)
+
+    def application_number(self, application_type: str, username: str) -> str:
+        """Get application number of a username"""
+        prefix = "C" if application_type == "citizen" else "E"
+        return f"{prefix}{self._seed(username) % 10**9:09d}"
+
+    def _step(self, username: str) -> tuple[int, float]:
+        """Get current step and when it was reached, offset per username"""
+        if self.change_interval <= 0:
+            return 0, self.started_at
+        offset = self._seed(username) % int(self.change_interval * 1000) / 1000
+        elapsed = time.time() - self.started_at + offset
+        step = min(int(elapsed // self.change_interval), self.max_steps)
+        return step, self.started_at - offset + step * self.change_interval
+
+    def citizen_details(self, username: str) -> dict:
+        """Build citizen get-application-details response"""
+        step, changed_at = self._step(username)
+        changed_ms = int(changed_at * 1000)
+        return {
+            "applicationNumber": self.application_number("citizen", username),
+            "uci": username,
+            "lastUpdatedTime": changed_ms,
+            "status": "complete" if step >= len(CITIZEN_ACTIVITIES) else "inProgress",
+            "activities": [
+                {
+                    "activity": activity,
+                    "order": order,
+                    "status": (
+                        "completed" if order < step
+                        else "inProgress" if order == step
+                        else "notStarted"
+                    ),
+                }
+                for order, activity in enumerate(CITIZEN_ACTIVITIES)
+            ],
+            "history": [
+                {
+                    "time": changed_ms - (step - 1 - index) * int(self.change_interval * 1000),
+                    "isNew": index == step - 1,
+                    "isWaiting": False,
+                    "type": "activity",
+                    "activity": CITIZEN_ACTIVITIES[index % len(CITIZEN_ACTIVITIES)],
+                    "loadTime": changed_ms,
+                    "title": {"en": f"Step {index + 1} updated", "fr": f"Étape {index + 1} mise à jour"},
+                    "text": {"en": "Mock update", "fr": "Mise à jour fictive"},
+                }
+                for index in range(step)
+            ],
+            "actions": [],
+        }
+
+    def immigrant_details(self, username: str) -> dict:
+        """Build immigrant get-application-details response"""
+        step, changed_at = self._step(username)
+        changed_iso = datetime.fromtimestamp(changed_at, timezone.utc).isoformat()
+        return {
+            "app": {
+                "appNum": self.application_number("immigrant", username),
+                "status": "decisionMade" if step >= len(IMMIGRANT_ACTIVITIES) else "inProgress",
+                "lastUpdated": changed_iso,
+            },
+            "relations": [
+                {
+                    "activities": {
+                        activity: (
+                            "completed" if order < step
+                            else "inProgress" if order == step
+                            else "notStarted"
+                        )
+                        for order, activity in enumerate(IMMIGRANT_ACTIVITIES)
+                    },
+                    "history": [
+                        {
+                            "key": IMMIGRANT_HISTORY_KEYS[index % len(IMMIGRANT_HISTORY_KEYS)],
+                            "dateCreated": datetime.fromtimestamp(
+                                changed_at - (step - 1 - index) * self.change_interval, timezone.utc
+                            ).isoformat(),
+                            "dateLoaded": changed_iso,
+                        }
+                        for index in range(step)
+                    ],
+                    "actions": [],
+                }
+            ],
+        }
+
+
+def create_app(args: argparse.Namespace) -> Flask:
+    """Create mock server application"""
+    app = Flask(__name__)
+    latency = LatencyDistribution(args.latency)
+    auth_latency = LatencyDistribution(args.auth_latency or args.latency)
+    throttle = Throttle(args.rate_limit, args.burst)
+    applications = MockApplications(args.change_interval, args.max_steps)
+    refresh_tokens: dict[str, str] = {}
+    refresh_tokens_lock = threading.Lock()
+
+    def simulate(delay: LatencyDistribution):
+        """Apply throttling, latency and injected errors, returns an error response or None"""
+        if not throttle.allow():
+            return jsonify({"__type": "TooManyRequestsException", "message": "Rate exceeded"}), 429
+        time.sleep(delay.sample())
+        if random.random() < args.error_rate:
+            return jsonify({"message": "Injected failure"}), random.choice([500, 502, 503])
+        return None
+
+    def issue_tokens(username: str, with_refresh_token: bool) -> dict:
+        now = int(time.time())
+        result = {
+            "IdToken": jwt.encode(
+                {"sub": username, "iat": now, "exp": now + args.token_ttl},
+                TOKEN_SECRET,
+                algorithm="HS256",
+            ),
+            "AccessToken": secrets.token_urlsafe(32),
+            "ExpiresIn": args.token_ttl,
+            "TokenType": "Bearer",
+        }
+        if with_refresh_token:
+            refresh_token = secrets.token_urlsafe(48)
+            with refresh_tokens_lock:
+                refresh_tokens[refresh_token] = username
+            result["RefreshToken"] = refresh_token
+        return result
+
+    def not_authorized(message: str):
+        return jsonify({"__type": "NotAuthorizedException", "message": message}), 400
+
+    @app.route("/cognito/", methods=["POST"])
+    def initiate_auth():
+        """Cognito InitiateAuth"""
+        error = simulate(auth_latency)
+        if error:
+            return error
+
+        payload = request.get_json(force=True, silent=True) or {}
+        parameters = payload.get("AuthParameters", {})
+        if payload.get("AuthFlow") == "USER_PASSWORD_AUTH":
+            if parameters.get("PASSWORD") == REJECTED_PASSWORD:
+                return not_authorized("Incorrect username or password.")
+            return jsonify({"AuthenticationResult": issue_tokens(parameters.get("USERNAME", ""), True)})
+        if payload.get("AuthFlow") == "REFRESH_TOKEN_AUTH":
+            with refresh_tokens_lock:
+                username = refresh_tokens.get(parameters.get("REFRESH_TOKEN", ""))
+            if username is None:
+                return not_authorized("Invalid Refresh Token")
+            return jsonify({"AuthenticationResult": issue_tokens(username, False)})
+        return jsonify({"__type": "InvalidParameterException", "message": "Unsupported AuthFlow"}), 400
+
+    def tracker_api(application_type: str):
+        error = simulate(latency)
+        if error:
+            return error
+
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        try:
+            username = jwt.decode(token, TOKEN_SECRET, algorithms=["HS256"])["sub"]
+        except jwt.InvalidTokenError:
+            return jsonify({"message": "Unauthorized"}), 401
+
+        payload = request.get_json(force=True, silent=True) or {}
+        method = payload.get("method")
+        if method == "get-profile-summary":
+            number = applications.application_number(application_type, username)
+            key = "appNumber" if application_type == "citizen" else "appNum"
+            return jsonify({"apps": [{key: number}]})
+        if method == "get-application-details":
+            if application_type == "citizen":
+                return jsonify(applications.citizen_details(username))
+            return jsonify(applications.immigrant_details(username))
+        return jsonify({"message": f"Unknown method {method}"}), 400
+
+    @app.route("/citizen/user", methods=["POST"])
+    def citizen_api():
+        """Citizenship tracker API"""
+        return tracker_api("citizen")
+
+    @app.route("/immigrant/user", methods=["POST"])
+    def immigrant_api():
+        """Immigration tracker API"""
+        return tracker_api("immigrant")
+
+    return app
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--latency", default="lognormal:-3:0.5",
+                        help="API latency distribution, e.g. fixed:0.05, uniform:0.02:0.2, exponential:0.1")
+    parser.add_argument("--auth-latency", default=None,
+                        help="Cognito latency distribution, defaults to --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Share of requests answered with a 5xx error")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Requests per second before answering 429, 0 disables throttling")
+    parser.add_argument("--burst", type=int, default=50, help="Throttling burst size")
+    parser.add_argument("--token-ttl", type=int, default=3600, help="IdToken lifetime in seconds")
+    parser.add_argument("--change-interval", type=float, default=600,
+                        help="Seconds between status changes of an application, 0 disables changes")
+    parser.add_argument("--max-steps", type=int, default=5,
+                        help="Number of status changes before an application stops changing")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    create_app(args).run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,112 @@
+"""Benchmark response parsing, diffing and persistence on recorded IRCC responses.
+
+Record responses first by running the checker with IRCC_CASSETTE_MODE=record,
+then from the backend directory run:
+
+    python -m tools.replay_benchmark ircc_cassette.jsonl --amplify-history 50
+"""
+
+import argparse
+import copy
+import cProfile
+import pstats
+import time
+from collections import defaultdict
+
+from models.ircc_credential import IRCCCredential
+from services.ircc_checker import IRCCChecker
+from utils.cassette import Cassette
+from utils.ircc_agent import IRCCAgentFactory
+
+
+def amplify_history(application_type: str, response: dict, factor: int) -> dict:
+    """Repeat history entries to simulate long-running applications"""
+    if factor <= 1:
+        return response
+    response = copy.deepcopy(response)
+    if application_type == "citizen":
+        response["history"] = response.get("history", []) * factor
+    else:
+        for relation in response.get("relations", []):
+            relation["history"] = relation.get("history", []) * factor
+    return response
+
+
+def load_details(path: str, factor: int) -> list[tuple[str, str, dict]]:
+    """Load recorded get-application-details responses as (key, type, response)"""
+    return [
+        (
+            entry["key"],
+            entry["application_type"],
+            amplify_history(entry["application_type"], entry["response"], factor),
+        )
+        for entry in Cassette.read_entries(path)
+        if entry["method"] == "get-application-details"
+    ]
+
+
+def run(details: list[tuple[str, str, dict]], repeat: int, persist: bool) -> dict:
+    """Process every response like the checker does, returns seconds per phase"""
+    timings = defaultdict(float)
+    for _ in range(repeat):
+        previous_records = {}
+        for key, application_type, response in details:
+            agent = IRCCAgentFactory.get_ircc_agent(application_type)
+            credential = IRCCCredential(
+                "benchmark", key[:12], "", "", application_type, application_number=key[:10]
+            )
+
+            started = time.perf_counter()
+            IRCCChecker.fingerprint_response(response)
+            timings["fingerprint"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            record = agent.parse_application_details(credential, response)
+            timings["parse"] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            IRCCChecker.compare_application_details(previous_records.get(key), record)
+            timings["compare"] += time.perf_counter() - started
+            previous_records[key] = record
+
+            if persist:
+                started = time.perf_counter()
+                record.save()
+                timings["persist"] += time.perf_counter() - started
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="Cassette file recorded with IRCC_CASSETTE_MODE=record")
+    parser.add_argument("--repeat", type=int, default=10, help="Passes over the recorded responses")
+    parser.add_argument("--amplify-history", type=int, default=1,
+                        help="Repeat each history list this many times")
+    parser.add_argument("--persist", action="store_true",
+                        help="Also save records to the configured MongoDB database")
+    parser.add_argument("--profile", action="store_true", help="Print cProfile hot spots")
+    args = parser.parse_args()
+
+    details = load_details(args.path, args.amplify_history)
+    if not details:
+        print(f"No get-application-details responses in {args.path}")
+        return
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    timings = run(details, args.repeat, args.persist)
+    if profiler:
+        profiler.disable()
+
+    operations = len(details) * args.repeat
+    print(f"{len(details)} responses x {args.repeat} passes = {operations} operations")
+    for phase, seconds in timings.items():
+        print(f"{phase:>12}: {seconds:8.3f}s total, {seconds / operations * 1e6:10.1f}us per response")
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
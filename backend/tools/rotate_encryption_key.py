@@ -0,0 +1,66 @@
+"""Re-encrypt stored IRCC passwords with the current ENCRYPTION_KEY.
+
+To rotate the key without downtime:
+
+1. Deploy every app.py and worker.py process with the new key in
+   ENCRYPTION_KEY and the old one in ENCRYPTION_PREVIOUS_KEYS. Both keys
+   decrypt, new data uses the new key.
+2. From the backend directory run:
+
+       python -m tools.rotate_encryption_key --workers 4 --ops-per-second 500
+
+   Progress is checkpointed; run the same command again to resume after an
+   interruption.
+3. Once --status reports nothing pending, remove ENCRYPTION_PREVIOUS_KEYS.
+
+The same command moves legacy PBKDF2 ciphertexts to the current format.
+"""
+
+import argparse
+import logging
+import os
+import signal
+
+from config import Config
+from models.database import db_instance
+from services.encryption_migration import EncryptionMigration
+from utils.encryption import encryption_manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes re-encrypting batches in parallel")
+    parser.add_argument("--batch-size", type=int, default=Config.ENCRYPTION_MIGRATION_BATCH_SIZE,
+                        help="Credentials per bulk write")
+    parser.add_argument("--ops-per-second", type=float, default=Config.ENCRYPTION_MIGRATION_OPS_PER_SECOND,
+                        help="Write throttle, 0 disables throttling")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the checkpoint and scan from the first credential")
+    parser.add_argument("--status", action="store_true", help="Only print progress")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if not db_instance.connect():
+        raise SystemExit("Database connection failed")
+
+    migration = EncryptionMigration(args.batch_size, args.ops_per_second, args.workers)
+    print(f"Current key id: {encryption_manager.key_id}, "
+          f"accepted key ids: {', '.join(encryption_manager.master_keys)}")
+    if args.status:
+        checkpoint = migration.get_checkpoint() or {}
+        print(f"Pending: {migration.count_pending()}, checkpoint: {checkpoint.get('result')}, "
+              f"completed at: {checkpoint.get('completed_at')}")
+        return
+
+    # Finish the current batch on Ctrl+C or SIGTERM, the next run resumes after it
+    signal.signal(signal.SIGINT, lambda signum, frame: migration.stop())
+    signal.signal(signal.SIGTERM, lambda signum, frame: migration.stop())
+    result = migration.run(restart=args.restart)
+    print(f"{result['status']}: migrated {result.get('migrated', 0)}, "
+          f"failed {result.get('failed', 0)}, skipped {result.get('skipped', 0)}, "
+          f"pending {migration.count_pending()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""Asyncio variants of the IRCC agents for high-concurrency scheduled checks."""
+
+import asyncio
+import logging
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import aiohttp
+
+from config import Config
+from models.application_records import ApplicationRecord
+from models.ircc_credential import IRCCCredential
+from utils.cassette import cassette
+from utils.circuit_breaker import (
+    UpstreamUnavailableError,
+    circuit_breakers,
+    is_upstream_failure_status,
+)
+from utils.http_session import get_request_timeout
+from utils.ircc_agent import (
+    ApplicationSummary,
+    IRCCAgentFactory,
+    IRCCCitizenAgent,
+    IRCCImmigrantAgent,
+    SecretProvider,
+)
+from utils.json_codec import json_codec
+from utils.rate_limiter import rate_limiter
+from utils.retry import retry_policy
+from utils.single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncIRCCAgentMixin:
+    """Replace the blocking HTTP calls of an IRCCAgent with aiohttp.
+
+    Request building and response parsing are inherited from the sync agent,
+    so both variants produce identical ApplicationRecord objects.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._token_flight = AsyncSingleFlight()
+        self._details_flight = AsyncSingleFlight()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get HTTP session bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            # aiohttp caps a session at 100 connections by default
+            connector = aiohttp.TCPConnector(
+                limit=Config.CHECK_ASYNC_CONCURRENCY,
+                limit_per_host=Config.HTTP_ASYNC_POOL_MAXSIZE,
+                keepalive_timeout=Config.HTTP_KEEPALIVE_SECONDS,
+            )
+            connect_timeout, read_timeout = get_request_timeout()
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=connect_timeout, sock_read=read_timeout
+                ),
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """Close HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def _call_store(self, func: Callable, *args):
+        """Run a token store call, off the event loop when the store does I/O"""
+        if self.token_store.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def _get_token(
+        self, user_id: str, ircc_username: str, get_password: SecretProvider
+    ) -> Optional[str]:
+        """Get authentication token, get_password is only called if Cognito must be asked"""
+        key = (user_id, ircc_username)
+        # Check store first
+        cached_token = await self._call_store(self.token_store.get, key)
+        if cached_token:
+            return cached_token
+
+        return await self._token_flight.do(
+            key, self._acquire_token, key, ircc_username, get_password
+        )
+
+    async def _acquire_token(
+        self, key: Tuple[str, str], ircc_username: str, get_password: SecretProvider
+    ) -> Optional[str]:
+        """Get token from Cognito, runs once per account at a time"""
+        # A concurrent call may have stored a token since the caller checked
+        cached_token = await self._call_store(self.token_store.get, key)
+        if cached_token:
+            return cached_token
+
+        # Renew with the refresh token, fall back to password auth if it is rejected
+        entry = await self._call_store(self.token_store.get_entry, key)
+        if entry and entry.refresh_token:
+            token = await self._renew_token(key, entry.refresh_token)
+            if token:
+                return token
+
+        # PBKDF2 key derivation is CPU bound, keep it off the event loop
+        password = await asyncio.to_thread(get_password)
+        return await self._login(key, ircc_username, password)
+
+    async def _login(
+        self, key: Tuple[str, str], ircc_username: str, ircc_password: str
+    ) -> Optional[str]:
+        """Get new tokens with USER_PASSWORD_AUTH"""
+        result = await self._initiate_auth(
+            self._build_token_payload(ircc_username, ircc_password)
+        )
+        return await self._call_store(self._store_auth_result, key, result)
+
+    async def _renew_token(
+        self, key: Tuple[str, str], refresh_token: str
+    ) -> Optional[str]:
+        """Get new IdToken with REFRESH_TOKEN_AUTH"""
+        result = await self._initiate_auth(self._build_refresh_payload(refresh_token))
+        token = await self._call_store(self._store_auth_result, key, result)
+        if not token:
+            # Refresh token expired or was revoked, next renewal needs the password
+            await self._call_store(self.token_store.pop, key)
+        return token
+
+    async def _initiate_auth(self, payload: dict) -> Optional[Dict[str, Any]]:
+        """Call Cognito InitiateAuth, returns AuthenticationResult"""
+        if cassette.is_replaying:
+            return cassette.replay_auth_result()
+        return await retry_policy.call_async(self._send_auth_request, payload)
+
+    async def _send_auth_request(self, payload: dict) -> Optional[Dict[str, Any]]:
+        """Send one InitiateAuth request"""
+        headers = self._get_auth_headers()
+
+        circuit_breakers.before_request(self.cognito_url)
+        try:
+            await rate_limiter.acquire_async(self.cognito_url)
+            async with self._get_session().post(
+                self.cognito_url, headers=headers, json=payload
+            ) as response:
+                status = response.status
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            circuit_breakers.record_failure(self.cognito_url)
+            raise UpstreamUnavailableError(f"Cognito request error: {str(e)}")
+        if is_upstream_failure_status(status):
+            circuit_breakers.record_failure(self.cognito_url)
+            raise UpstreamUnavailableError(f"Cognito request failed: {status}")
+        circuit_breakers.record_success(self.cognito_url)
+
+        try:
+            if status == 200:
+                # Cognito answers with application/x-amz-json-1.1
+                return self._parse_auth_result(json_codec.loads(body))
+        except Exception as e:
+            logger.error(f"Error getting token: {str(e)}")
+
+        return None
+
+    async def _make_api_request(
+        self, token: str, method: str, **kwargs
+    ) -> Dict[str, Any]:
+        """Make API request with token, retrying transient upstream failures"""
+        if cassette.is_replaying:
+            return cassette.replay(self.application_type, method, kwargs)
+        response = await retry_policy.call_async(
+            self._send_api_request, token, method, **kwargs
+        )
+        if cassette.is_recording:
+            await asyncio.to_thread(
+                cassette.record, self.application_type, method, kwargs, response
+            )
+        return response
+
+    async def _send_api_request(
+        self, token: str, method: str, **kwargs
+    ) -> Dict[str, Any]:
+        """Send one API request"""
+        headers = self._get_api_headers(token)
+        payload = {"method": method, **kwargs}
+
+        circuit_breakers.before_request(self.base_url)
+        try:
+            await rate_limiter.acquire_async(self.base_url)
+            async with self._get_session().post(
+                self.base_url, headers=headers, json=payload
+            ) as response:
+                status = response.status
+                body = await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            circuit_breakers.record_failure(self.base_url)
+            raise UpstreamUnavailableError(f"API request error: {str(e)}")
+        if is_upstream_failure_status(status):
+            circuit_breakers.record_failure(self.base_url)
+            raise UpstreamUnavailableError(
+                f"API request failed: {status} {body.decode(errors='replace')}"
+            )
+        circuit_breakers.record_success(self.base_url)
+
+        try:
+            if status == 200:
+                return json_codec.loads(body)
+            raise Exception(
+                f"API request failed: {status} {body.decode(errors='replace')}"
+            )
+        except Exception as e:
+            raise Exception(f"API request error: {str(e)}")
+
+    @staticmethod
+    def with_token(func: Callable) -> Callable:
+        """Decorator to handle token management"""
+
+        @wraps(func)
+        async def wrapper(self, credential: IRCCCredential, *args, **kwargs):
+            # Get token, the password is decrypted only on a token store miss
+            token = await self._get_token(
+                credential.user_id,
+                credential.ircc_username,
+                self._password_provider(credential),
+            )
+
+            if not token:
+                raise Exception("Failed to get authentication token")
+
+            # Call original function with token
+            return await func(self, credential, token=token, *args, **kwargs)
+
+        return wrapper
+
+    async def verify_ircc_credentials(
+        self, user_id: str, ircc_username: str, ircc_password: str
+    ) -> bool:
+        """Verify IRCC credentials"""
+        # Always log in with the given password, not a shared in-flight token request
+        key = (user_id, ircc_username)
+        await self._call_store(self.token_store.pop, key)
+        try:
+            token = await self._login(key, ircc_username, ircc_password)
+        except UpstreamUnavailableError as e:
+            # Cognito outage is not proof of bad credentials, callers save and warn
+            logger.warning(f"Could not verify IRCC credentials of {ircc_username}: {str(e)}")
+            return False
+        return bool(token)
+
+    @with_token
+    async def get_application_summary(
+        self, credential: IRCCCredential, token: Optional[str] = None
+    ) -> list[ApplicationSummary]:
+        """Get application summary"""
+        response = await self._make_api_request(
+            token, "get-profile-summary", limit="500"
+        )
+        return self._parse_application_summary(response)
+
+    async def get_application_details_response(
+        self, credential: IRCCCredential
+    ) -> Dict[str, Any]:
+        """Get raw get-application-details response"""
+        return await self._details_flight.do(
+            (
+                credential.user_id,
+                credential.ircc_username,
+                credential.application_number,
+            ),
+            self._fetch_application_details_response,
+            credential,
+        )
+
+    @with_token
+    async def _fetch_application_details_response(
+        self, credential: IRCCCredential, token: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Fetch get-application-details response"""
+        return await self._make_api_request(
+            token,
+            "get-application-details",
+            **self._application_details_params(credential),
+        )
+
+    async def get_application_details(
+        self, credential: IRCCCredential
+    ) -> ApplicationRecord:
+        """Get application details"""
+        return self.parse_application_details(
+            credential, await self.get_application_details_response(credential)
+        )
+
+
+class AsyncIRCCCitizenAgent(AsyncIRCCAgentMixin, IRCCCitizenAgent):
+    """Asyncio citizen application agent"""
+
+
+class AsyncIRCCImmigrantAgent(AsyncIRCCAgentMixin, IRCCImmigrantAgent):
+    """Asyncio immigrant application agent"""
+
+
+class AsyncIRCCAgentFactory:
+    _instances = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_ircc_agent(cls, application_type: str) -> AsyncIRCCAgentMixin:
+        """Get async IRCC agent singleton instance"""
+        with cls._lock:
+            if application_type not in cls._instances:
+                if application_type == "citizen":
+                    agent = AsyncIRCCCitizenAgent()
+                elif application_type == "immigrant":
+                    agent = AsyncIRCCImmigrantAgent()
+                else:
+                    raise ValueError("Invalid application type")
+                # Share tokens with the sync agent used by the Flask routes
+                sync_agent = IRCCAgentFactory.get_ircc_agent(application_type)
+                agent.token_store = sync_agent.token_store
+                cls._instances[application_type] = agent
+            return cls._instances[application_type]
+
+    @classmethod
+    async def close_all(cls):
+        """Close HTTP sessions of all async agents"""
+        for agent in list(cls._instances.values()):
+            await agent.close()
@@ -0,0 +1,142 @@
+"""Record and replay upstream IRCC API responses for offline benchmarking.
+
+In record mode every tracker API response is appended to a JSON lines file.
+Request parameters are stored only as a hash, and token or password fields in
+responses are redacted. Authorization headers and Cognito traffic are never
+written. In replay mode the agents answer from the file without any network
+access; responses recorded for the same request are returned in order,
+cycling when they run out.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List
+
+from config import Config
+from utils.json_codec import json_codec
+
+logger = logging.getLogger(__name__)
+
+SENSITIVE_KEY_PARTS = ("token", "password", "authorization", "secret")
+REDACTED = "[REDACTED]"
+
+
+def scrub(value: Any) -> Any:
+    """Redact token, password and secret fields of a JSON value"""
+    if isinstance(value, dict):
+        return {
+            key: (
+                REDACTED
+                if any(part in key.lower() for part in SENSITIVE_KEY_PARTS)
+                else scrub(item)
+            )
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    return value
+
+
+class CassetteMissError(Exception):
+    """No recorded response matches a replayed request"""
+
+
+class Cassette:
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, mode: str, path: str):
+        if mode not in (self.OFF, self.RECORD, self.REPLAY):
+            raise ValueError(f"Invalid cassette mode: {mode}")
+        self.mode = mode
+        self.path = path
+        self.lock = threading.Lock()
+        self._responses: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        if mode == self.REPLAY:
+            self.load()
+
+    @classmethod
+    def from_config(cls) -> "Cassette":
+        """Create cassette from configuration"""
+        return cls(Config.IRCC_CASSETTE_MODE, Config.IRCC_CASSETTE_PATH)
+
+    @property
+    def is_recording(self) -> bool:
+        return self.mode == self.RECORD
+
+    @property
+    def is_replaying(self) -> bool:
+        return self.mode == self.REPLAY
+
+    @staticmethod
+    def request_key(application_type: str, method: str, params: Dict[str, Any]) -> str:
+        """Hash a request so recorded files do not contain usernames or numbers"""
+        normalized = json.dumps(
+            [application_type, method, params], sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def load(self):
+        """Load recorded responses"""
+        with self.lock:
+            self._responses.clear()
+            self._positions.clear()
+            for entry in self.read_entries(self.path):
+                self._responses[entry["key"]].append(entry["response"])
+        logger.info(f"Loaded {sum(map(len, self._responses.values()))} recorded responses from {self.path}")
+
+    def record(
+        self,
+        application_type: str,
+        method: str,
+        params: Dict[str, Any],
+        response: Dict[str, Any],
+    ):
+        """Append a scrubbed response"""
+        entry = {
+            "key": self.request_key(application_type, method, params),
+            "application_type": application_type,
+            "method": method,
+            "response": scrub(response),
+        }
+        line = json_codec.dumps(entry) + b"\n"
+        with self.lock:
+            with open(self.path, "ab") as file:
+                file.write(line)
+
+    def replay(
+        self, application_type: str, method: str, params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Get the next recorded response for a request"""
+        key = self.request_key(application_type, method, params)
+        with self.lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise CassetteMissError(
+                    f"No recorded {application_type} response for {method}"
+                )
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            return responses[position % len(responses)]
+
+    @staticmethod
+    def read_entries(path: str) -> Iterator[Dict[str, Any]]:
+        """Read recorded entries in file order"""
+        with open(path, "rb") as file:
+            for line in file:
+                if line.strip():
+                    yield json_codec.loads(line)
+
+    @staticmethod
+    def replay_auth_result() -> Dict[str, Any]:
+        """Get Cognito result used while replaying, no login happens"""
+        return {"IdToken": "replayed-id-token", "RefreshToken": "replayed-refresh-token"}
+
+
+# Global cassette instance
+cassette = Cassette.from_config()
@@ -0,0 +1,213 @@
+"""Per-endpoint circuit breakers for upstream IRCC and Cognito calls."""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailableError(Exception):
+    """Upstream endpoint is failing or its circuit is open.
+
+    Raised for failures that may not be caused by the credential being
+    checked. Callers count it toward the credential's retry state only while
+    the circuit stays closed.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    """Request was rejected without being sent because the circuit is open"""
+
+
+def is_upstream_failure_status(status_code: int) -> bool:
+    """Check if an HTTP status means the endpoint is unhealthy or throttling us"""
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """Opens when the failure rate over a sliding window crosses a threshold.
+
+    After open_seconds it lets a few probe requests through (half-open); the
+    circuit closes if they all succeed and opens again on the first failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float,
+        minimum_requests: int,
+        window_seconds: float,
+        open_seconds: float,
+        half_open_probes: int,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_requests = minimum_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(half_open_probes, 1)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probes_started = 0
+        self.probes_succeeded = 0
+        self.results: deque[tuple[float, bool]] = deque()
+        self.lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self.results and self.results[0][0] < now - self.window_seconds:
+            self.results.popleft()
+
+    def _open(self, now: float):
+        if self.state != self.OPEN:
+            logger.warning(
+                f"Circuit opened for {self.name}, pausing requests for {self.open_seconds:.0f}s"
+            )
+        self.state = self.OPEN
+        self.opened_at = now
+        self.results.clear()
+
+    def retry_after(self) -> float:
+        """Get seconds until the circuit lets probe requests through"""
+        with self.lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(self.opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def is_open(self) -> bool:
+        """Check if requests are currently rejected"""
+        return self.retry_after() > 0
+
+    def allow_request(self) -> bool:
+        """Check if a request may be sent, reserving a probe slot when half-open"""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now < self.opened_at + self.open_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self.probes_started = 0
+                self.probes_succeeded = 0
+            if self.state == self.HALF_OPEN:
+                if self.probes_started >= self.half_open_probes:
+                    return False
+                self.probes_started += 1
+            return True
+
+    def record_success(self):
+        """Record a request that reached a healthy endpoint"""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self.probes_succeeded += 1
+                if self.probes_succeeded >= self.half_open_probes:
+                    logger.info(f"Circuit closed for {self.name}")
+                    self.state = self.CLOSED
+                return
+            self.results.append((now, True))
+            self._prune(now)
+
+    def record_failure(self):
+        """Record a timeout, connection error or unhealthy response"""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._open(now)
+                return
+            if self.state == self.OPEN:
+                return
+            self.results.append((now, False))
+            self._prune(now)
+            failures = sum(1 for _, success in self.results if not success)
+            if (
+                len(self.results) >= self.minimum_requests
+                and failures / len(self.results) >= self.failure_rate_threshold
+            ):
+                self._open(now)
+
+
+class CircuitBreakerRegistry:
+    def __init__(
+        self,
+        failure_rate_threshold: float,
+        minimum_requests: int,
+        window_seconds: float,
+        open_seconds: float,
+        half_open_probes: int,
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_requests = minimum_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "CircuitBreakerRegistry":
+        """Create registry from configuration"""
+        return cls(
+            Config.CIRCUIT_BREAKER_FAILURE_RATE,
+            Config.CIRCUIT_BREAKER_MIN_REQUESTS,
+            Config.CIRCUIT_BREAKER_WINDOW_SECONDS,
+            Config.CIRCUIT_BREAKER_OPEN_SECONDS,
+            Config.CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+        )
+
+    def get_breaker(self, endpoint: str) -> CircuitBreaker:
+        """Get circuit breaker of an endpoint URL"""
+        with self.lock:
+            breaker = self.breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    endpoint,
+                    self.failure_rate_threshold,
+                    self.minimum_requests,
+                    self.window_seconds,
+                    self.open_seconds,
+                    self.half_open_probes,
+                )
+                self.breakers[endpoint] = breaker
+            return breaker
+
+    def before_request(self, endpoint: str):
+        """Raise CircuitOpenError if the endpoint's circuit rejects the request"""
+        breaker = self.get_breaker(endpoint)
+        if not breaker.allow_request():
+            raise CircuitOpenError(
+                f"Circuit open for {endpoint}", breaker.retry_after()
+            )
+
+    def record_success(self, endpoint: str):
+        """Record successful request to an endpoint"""
+        self.get_breaker(endpoint).record_success()
+
+    def record_failure(self, endpoint: str):
+        """Record failed request to an endpoint"""
+        self.get_breaker(endpoint).record_failure()
+
+    def retry_after(self) -> float:
+        """Get seconds until every open circuit lets probe requests through"""
+        with self.lock:
+            breakers = list(self.breakers.values())
+        return max((breaker.retry_after() for breaker in breakers), default=0.0)
+
+    def any_open(self) -> bool:
+        """Check if any endpoint currently rejects requests"""
+        return self.retry_after() > 0
+
+
+# Global circuit breaker registry
+circuit_breakers = CircuitBreakerRegistry.from_config()
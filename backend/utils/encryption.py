@@ -1,15 +1,124 @@
-"""Encryption utilities for securing sensitive user data using Fernet encryption."""
+"""Encryption utilities for securing sensitive user data.
 
-from cryptography.fernet import Fernet
+Ciphertexts are written as "v2.<key id>.<base64 nonce + AES-GCM ciphertext>"
+with a key derived once per process from ENCRYPTION_KEY by HKDF, and the
+record salt bound as associated data. Legacy ciphertexts, base64 Fernet
+tokens keyed by PBKDF2 over the record salt, are still decrypted. Data
+encrypted with any of ENCRYPTION_PREVIOUS_KEYS decrypts too, so a key can be
+rotated while the application keeps running.
+"""
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterable
 import base64
+import ctypes
+import ctypes.util
+import logging
+import multiprocessing
 import os
+import threading
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+CIPHERTEXT_VERSION = "v2"
+NONCE_SIZE = 12
+# Fewer legacy keys than this are derived inline, the process pool round trip is not worth it
+PARALLEL_DERIVE_MIN = 8
+
+# mlockall flags from <sys/mman.h>
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+
+def lock_process_memory() -> bool:
+    """Keep current and future process memory out of swap, returns False if not permitted"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            errno = ctypes.get_errno()
+            logger.warning(f"mlockall failed: {os.strerror(errno)}, derived keys may be swapped out")
+            return False
+    except (OSError, AttributeError, TypeError) as e:
+        logger.warning(f"mlockall is not available: {str(e)}, derived keys may be swapped out")
+        return False
+    logger.info("Process memory locked, derived keys will not be swapped out")
+    return True
+
+
+def derive_legacy_key(master_key: bytes, salt: bytes) -> bytes:
+    """Derive the Fernet key of a legacy ciphertext, runs in pool processes"""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=100000,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(master_key))
+
+
+def match_legacy_key(
+    master_keys: list[tuple[str, bytes]], salt: bytes, token: bytes
+) -> tuple[str, bytes] | None:
+    """Derive legacy keys of a salt in turn until one authenticates token, runs in pool processes
+
+    Returns the key id and key, or None if no master key matches.
+    """
+    for key_id, master_key in master_keys:
+        key = derive_legacy_key(master_key, salt)
+        try:
+            # Checks the HMAC without decrypting
+            Fernet(key).extract_timestamp(token)
+        except InvalidToken:
+            continue
+        return key_id, key
+    return None
+
+
+def _hkdf(master_key: bytes, info: bytes, length: int) -> bytes:
+    return HKDF(algorithm=hashes.SHA256(), length=length, salt=None, info=info).derive(master_key)
+
+
+def _key_id(master_key: bytes) -> str:
+    return _hkdf(master_key, b"ircc-tracker key id", 4).hex()
+
+
 class EncryptionManager:
-    def __init__(self):
+    def __init__(self, key_cache_size: int | None = None):
         self.key = Config.ENCRYPTION_KEY.encode()
+        # Versioned format key, derived once; the key id tells which master key encrypted a record
+        self.key_id = _key_id(self.key)
+        # Master keys accepted for decryption, current key first
+        self.master_keys: dict[str, bytes] = {self.key_id: self.key}
+        for previous_key in Config.ENCRYPTION_PREVIOUS_KEYS.split(','):
+            if previous_key.strip():
+                previous_key = previous_key.strip().encode()
+                self.master_keys.setdefault(_key_id(previous_key), previous_key)
+        self._aeads = {
+            key_id: AESGCM(_hkdf(master_key, b"ircc-tracker credential encryption v2", 32))
+            for key_id, master_key in self.master_keys.items()
+        }
+        self._aead = self._aeads[self.key_id]
+        self.write_version = Config.ENCRYPTION_WRITE_VERSION
+        # Ciphers for data without a per-record salt, keyed by context
+        self._context_fernets: dict[str, MultiFernet] = {}
+        self._context_lock = threading.Lock()
+        # Least recently used ciphers keyed by master key id and per-record salt, 0 disables caching
+        self.key_cache_size = (
+            Config.ENCRYPTION_KEY_CACHE_SIZE if key_cache_size is None else key_cache_size
+        )
+        self._fernets: OrderedDict[tuple[str, str], Fernet] = OrderedDict()
+        self._fernets_lock = threading.Lock()
+        self.kdf_workers = Config.ENCRYPTION_KDF_WORKERS or os.cpu_count() or 1
+        self._kdf_pool: ProcessPoolExecutor | None = None
+        self._kdf_pool_lock = threading.Lock()
         
     def generate_salt(self) -> str:
         """Generate random salt"""
@@ -18,28 +127,165 @@ class EncryptionManager:
     def _get_or_create_key(self, salt: str) -> bytes:
         """Get or create encryption key"""
         # Use key from config as password
-        password = Config.ENCRYPTION_KEY.encode()
-        
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
+        return derive_legacy_key(self.key, salt)
+    
+    def _get_fernet(self, salt: str) -> Fernet:
+        """Get cipher of a salt under the current key, deriving it only on a cache miss"""
+        cache_key = (self.key_id, salt)
+        with self._fernets_lock:
+            fernet = self._fernets.get(cache_key)
+            if fernet is not None:
+                self._fernets.move_to_end(cache_key)
+                return fernet
+
+        # Derive outside the lock so other salts are not held up by PBKDF2
+        fernet = Fernet(self._get_or_create_key(salt.encode('utf-8')))
+        self._cache_fernets({cache_key: fernet})
+        return fernet
+    
+    def _cache_fernets(self, fernets: dict[tuple[str, str], Fernet]):
+        """Add ciphers to the cache, evicting the least recently used"""
+        if self.key_cache_size <= 0:
+            return
+        with self._fernets_lock:
+            for cache_key, fernet in fernets.items():
+                self._fernets[cache_key] = fernet
+                self._fernets.move_to_end(cache_key)
+            while len(self._fernets) > self.key_cache_size:
+                self._fernets.popitem(last=False)
+    
+    def _get_kdf_pool(self) -> ProcessPoolExecutor:
+        """Get process pool for legacy key derivation, started on first use"""
+        with self._kdf_pool_lock:
+            if self._kdf_pool is None:
+                # Spawned processes do not inherit locks held by the scheduler's threads
+                self._kdf_pool = ProcessPoolExecutor(
+                    max_workers=self.kdf_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._kdf_pool
+    
+    def _legacy_key_order(self) -> list[tuple[str, bytes]]:
+        """Master keys in the order legacy ciphertexts are tried
+
+        The current key only writes legacy ciphertexts with write version 1,
+        otherwise legacy data comes from before a rotation and previous keys
+        are tried first.
+        """
+        keys = list(self.master_keys.items())
+        if self.write_version == 1:
+            return keys
+        return keys[1:] + keys[:1]
+    
+    def _find_cached_fernet(self, salt: str) -> Fernet | None:
+        """Get the cached cipher of a salt under any accepted master key"""
+        with self._fernets_lock:
+            for key_id in self.master_keys:
+                fernet = self._fernets.get((key_id, salt))
+                if fernet is not None:
+                    self._fernets.move_to_end((key_id, salt))
+                    return fernet
+        return None
+    
+    def prederive_keys(self, items: Iterable[tuple[str, str]]) -> int:
+        """Derive and cache the matching keys of uncached legacy (salt, encrypted_text) pairs
+
+        Keys are derived across processes and only the master key each
+        ciphertext was encrypted with is cached. Returns count cached.
+        """
+        if self.key_cache_size <= 0:
+            return 0
+        missing: dict[str, bytes] = {}
+        with self._fernets_lock:
+            for salt, encrypted_text in items:
+                if salt is None or not self.is_legacy(encrypted_text) or salt in missing:
+                    continue
+                if any((key_id, salt) in self._fernets for key_id in self.master_keys):
+                    continue
+                try:
+                    missing[salt] = base64.urlsafe_b64decode(encrypted_text.encode('utf-8'))
+                except ValueError:
+                    continue  # Reported when the ciphertext is decrypted
+        # Keys beyond the cache size would only evict each other
+        salts = list(missing)[:self.key_cache_size]
+        if not salts:
+            return 0
         
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        return key
+        key_order = self._legacy_key_order()
+        salt_bytes = [salt.encode('utf-8') for salt in salts]
+        tokens = [missing[salt] for salt in salts]
+        if len(salts) < PARALLEL_DERIVE_MIN:
+            matches = [match_legacy_key(key_order, salt, token) for salt, token in zip(salt_bytes, tokens)]
+        else:
+            pool = self._get_kdf_pool()
+            chunksize = max(len(salts) // (self.kdf_workers * 4), 1)
+            matches = list(
+                pool.map(match_legacy_key, repeat(key_order), salt_bytes, tokens, chunksize=chunksize)
+            )
+        fernets = {
+            (match[0], salt): Fernet(match[1]) for salt, match in zip(salts, matches) if match
+        }
+        self._cache_fernets(fernets)
+        return len(fernets)
+    
+    def shutdown(self):
+        """Stop the key derivation processes"""
+        with self._kdf_pool_lock:
+            if self._kdf_pool is not None:
+                self._kdf_pool.shutdown()
+                self._kdf_pool = None
+    
+    def clear_key_cache(self):
+        """Drop all cached ciphers"""
+        with self._fernets_lock:
+            self._fernets.clear()
+    
+    def get_context_cipher(self, context: str) -> MultiFernet:
+        """Get cipher for a context such as a collection, keys are derived only once
+
+        Encrypts with the current key and decrypts with any accepted key.
+        """
+        with self._context_lock:
+            fernet = self._context_fernets.get(context)
+            if fernet is None:
+                fernet = MultiFernet([
+                    Fernet(derive_legacy_key(master_key, context.encode('utf-8')))
+                    for master_key in self.master_keys.values()
+                ])
+                self._context_fernets[context] = fernet
+            return fernet
+    
+    @property
+    def current_prefix(self) -> str:
+        """Get prefix of ciphertexts written in the current format and key"""
+        return f"{CIPHERTEXT_VERSION}.{self.key_id}."
+    
+    @staticmethod
+    def is_legacy(encrypted_text: str | None) -> bool:
+        """Check if a ciphertext needs a per-salt PBKDF2 key to decrypt"""
+        return bool(encrypted_text) and not encrypted_text.startswith(CIPHERTEXT_VERSION + ".")
+    
+    def needs_reencryption(self, encrypted_text: str | None) -> bool:
+        """Check if a ciphertext uses the legacy format or another key"""
+        return bool(encrypted_text) and not encrypted_text.startswith(self.current_prefix)
     
     def encrypt(self, salt: str, plaintext: str) -> str | None:
         """Encrypt text"""
         if not plaintext:
             return None
+        if self.write_version == 1:
+            return self._encrypt_legacy(salt, plaintext)
         
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = self._aead.encrypt(nonce, plaintext.encode('utf-8'), salt.encode('utf-8'))
+        return self.current_prefix + base64.urlsafe_b64encode(nonce + ciphertext).decode('ascii')
+    
+    def _encrypt_legacy(self, salt: str, plaintext: str) -> str:
+        """Encrypt text with PBKDF2 and Fernet"""
         try:
             # Convert string to bytes
             plaintext_bytes = plaintext.encode('utf-8')
-            salt_bytes = salt.encode('utf-8')
-            fernet = Fernet(self._get_or_create_key(salt_bytes))
+            fernet = self._get_fernet(salt)
             # Encrypt
             encrypted_bytes = fernet.encrypt(plaintext_bytes)
             # Convert to base64 string for storage
@@ -48,21 +294,70 @@ class EncryptionManager:
             raise Exception(f"Encryption failed: {str(e)}")
     
     def decrypt(self, salt: str, encrypted_text: str) -> str | None:
-        """Decrypt text"""
+        """Decrypt text in either format"""
         if not encrypted_text:
             return None
+        if self.is_legacy(encrypted_text):
+            return self._decrypt_legacy(salt, encrypted_text)
         
+        try:
+            _, key_id, payload = encrypted_text.split(".", 2)
+            aead = self._aeads.get(key_id)
+            if aead is None:
+                raise ValueError(f"unknown key id {key_id}")
+            data = base64.urlsafe_b64decode(payload.encode('ascii'))
+            plaintext = aead.decrypt(
+                data[:NONCE_SIZE], data[NONCE_SIZE:], salt.encode('utf-8')
+            )
+            return plaintext.decode('utf-8')
+        except Exception as e:
+            raise Exception(f"Decryption failed: {str(e) or type(e).__name__}")
+    
+    def decrypt_many(self, items: Iterable[tuple[str, str]]) -> list[str | None]:
+        """Decrypt (salt, encrypted_text) pairs, deriving legacy keys in parallel first"""
+        items = list(items)
+        self.prederive_keys(items)
+        return [self.decrypt(salt, encrypted_text) for salt, encrypted_text in items]
+    
+    def _decrypt_legacy(self, salt: str, encrypted_text: str) -> str:
+        """Decrypt base64 Fernet token keyed by PBKDF2 under any accepted master key"""
         try:
             # Convert from base64 string to bytes
             encrypted_bytes = base64.urlsafe_b64decode(encrypted_text.encode('utf-8'))
-            salt_bytes = salt.encode('utf-8')
-            fernet = Fernet(self._get_or_create_key(salt_bytes))
-            # Decrypt
-            decrypted_bytes = fernet.decrypt(encrypted_bytes)
+            # A cached cipher of the salt belongs to the key the record was encrypted with
+            fernet = self._find_cached_fernet(salt)
+            if fernet is not None:
+                try:
+                    return fernet.decrypt(encrypted_bytes).decode('utf-8')
+                except InvalidToken:
+                    pass
+            match = match_legacy_key(self._legacy_key_order(), salt.encode('utf-8'), encrypted_bytes)
+            if match is None:
+                raise InvalidToken("no accepted key matches")
+            key_id, key = match
+            fernet = Fernet(key)
+            self._cache_fernets({(key_id, salt): fernet})
             # Convert to string
-            return decrypted_bytes.decode('utf-8')
+            return fernet.decrypt(encrypted_bytes).decode('utf-8')
         except Exception as e:
-            raise Exception(f"Decryption failed: {str(e)}")
+            raise Exception(f"Decryption failed: {str(e) or type(e).__name__}")
     
+def reencrypt_many(items: list[tuple[str, str]]) -> list[tuple[str | None, str | None]]:
+    """Re-encrypt (salt, encrypted_text) pairs with the current key, runs in pool processes
+
+    Returns (new encrypted_text, None) or (None, error message) per pair.
+    """
+    results = []
+    for salt, encrypted_text in items:
+        try:
+            plaintext = encryption_manager.decrypt(salt, encrypted_text)
+            results.append((encryption_manager.encrypt(salt, plaintext), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+
 # Global encryption manager instance
-encryption_manager = EncryptionManager() 
\ No newline at end of file
+encryption_manager = EncryptionManager()
+if Config.ENCRYPTION_MLOCK:
+    lock_process_memory() 
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""Pooled keep-alive HTTP sessions for upstream IRCC and Cognito calls."""
+
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+from config import Config
+
+
+def create_http_session(pool_maxsize: int | None = None) -> requests.Session:
+    """Create session that keeps up to pool_maxsize connections alive per host
+
+    The underlying urllib3 pools are thread-safe, so one session can be shared
+    by all checker worker threads. Cookies are never stored, so responses for
+    one credential cannot leak into requests made for another.
+    """
+    pool_maxsize = pool_maxsize or Config.HTTP_POOL_MAXSIZE
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    adapter = HTTPAdapter(
+        pool_connections=Config.HTTP_POOL_HOSTS, pool_maxsize=pool_maxsize
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_request_timeout() -> tuple[float, float]:
+    """Get (connect, read) timeout for upstream requests"""
+    return (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
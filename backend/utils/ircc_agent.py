@@ -1,14 +1,33 @@
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import logging
 import requests
+import threading
 import time
 from typing import Optional, Tuple, Dict, Any, Callable
 from functools import wraps
-from cachetools import TTLCache
 
+from config import Config
 from models.application_records import Activity, ActivityStatus, ApplicationRecord, HistoryRecord
 from models.ircc_credential import IRCCCredential
+from utils.cassette import cassette
+from utils.circuit_breaker import (
+    UpstreamUnavailableError,
+    circuit_breakers,
+    is_upstream_failure_status,
+)
 from utils.encryption import encryption_manager
+from utils.http_session import create_http_session, get_request_timeout
+from utils.json_codec import json_codec
+from utils.rate_limiter import rate_limiter
+from utils.retry import retry_policy
+from utils.single_flight import SingleFlight
+from utils.token_store import create_token_store
 
+logger = logging.getLogger(__name__)
+
+# Returns the plaintext IRCC password, called only when a password login is needed
+SecretProvider = Callable[[], str]
 
 class ApplicationSummary:
     def __init__(self, application_type: str, application_number: str):
@@ -22,12 +41,20 @@ class ApplicationDetails:
 
 
 class IRCCAgent:
+    application_type: Optional[str] = None
+
     def __init__(self):
-        # use TTLCache, max size 10000, default 50 minutes expiration
         self.client_id: Optional[str] = None
         self.cognito_url: Optional[str] = None
         self.base_url: Optional[str] = None
-        self.token_cache = TTLCache(maxsize=10000, ttl=3000)
+        # Tokens are kept until shortly before their exp claim
+        self.token_store = create_token_store(self.application_type)
+        # Keep-alive connections shared by every thread using this agent
+        self.session = create_http_session()
+        self.timeout = get_request_timeout()
+        # Concurrent callers for the same account share one upstream call
+        self._token_flight = SingleFlight()
+        self._details_flight = SingleFlight()
 
     def _get_auth_headers(self, token: Optional[str] = None) -> dict:
         """Get authentication headers"""
@@ -53,50 +80,154 @@ class IRCCAgent:
         }
 
     def _get_token(
-        self, user_id: str, ircc_username: str, ircc_password: str
+        self, user_id: str, ircc_username: str, get_password: SecretProvider
     ) -> Optional[str]:
-        """Get authentication token"""
-        # Check cache first
-        cached_token = self.token_cache.get((user_id, ircc_username))
+        """Get authentication token, get_password is only called if Cognito must be asked"""
+        key = (user_id, ircc_username)
+        # Check store first
+        cached_token = self.token_store.get(key)
         if cached_token:
             return cached_token
 
-        # Get new token
+        return self._token_flight.do(
+            key, self._acquire_token, key, ircc_username, get_password
+        )
+
+    def _acquire_token(
+        self, key: Tuple[str, str], ircc_username: str, get_password: SecretProvider
+    ) -> Optional[str]:
+        """Get token from Cognito, runs once per account at a time"""
+        # A concurrent call may have stored a token since the caller checked
+        cached_token = self.token_store.get(key)
+        if cached_token:
+            return cached_token
+
+        # Renew with the refresh token, fall back to password auth if it is rejected
+        entry = self.token_store.get_entry(key)
+        if entry and entry.refresh_token:
+            token = self._renew_token(key, entry.refresh_token)
+            if token:
+                return token
+
+        return self._login(key, ircc_username, get_password())
+
+    def _login(
+        self, key: Tuple[str, str], ircc_username: str, ircc_password: str
+    ) -> Optional[str]:
+        """Get new tokens with USER_PASSWORD_AUTH"""
+        result = self._initiate_auth(
+            self._build_token_payload(ircc_username, ircc_password)
+        )
+        return self._store_auth_result(key, result)
+
+    def _renew_token(self, key: Tuple[str, str], refresh_token: str) -> Optional[str]:
+        """Get new IdToken with REFRESH_TOKEN_AUTH"""
+        result = self._initiate_auth(self._build_refresh_payload(refresh_token))
+        token = self._store_auth_result(key, result)
+        if not token:
+            # Refresh token expired or was revoked, next renewal needs the password
+            self.token_store.pop(key)
+        return token
+
+    def _store_auth_result(
+        self, key: Tuple[str, str], result: Optional[Dict[str, Any]]
+    ) -> Optional[str]:
+        """Store tokens of an AuthenticationResult, returns IdToken"""
+        token = result.get("IdToken") if result else None
+        if token:
+            # REFRESH_TOKEN_AUTH does not return a new refresh token, the store keeps the old one
+            self.token_store.put(key, token, result.get("RefreshToken"))
+        return token
+
+    def _initiate_auth(self, payload: dict) -> Optional[Dict[str, Any]]:
+        """Call Cognito InitiateAuth, returns AuthenticationResult"""
+        if cassette.is_replaying:
+            return cassette.replay_auth_result()
+        return retry_policy.call(self._send_auth_request, payload)
+
+    def _send_auth_request(self, payload: dict) -> Optional[Dict[str, Any]]:
+        """Send one InitiateAuth request"""
         headers = self._get_auth_headers()
-        payload = {
-            "AuthFlow": "USER_PASSWORD_AUTH",
-            "ClientId": self.client_id,
-            "AuthParameters": {"USERNAME": ircc_username, "PASSWORD": ircc_password},
-            "ClientMetadata": {},
-        }
 
+        circuit_breakers.before_request(self.cognito_url)
         try:
-            response = requests.post(
-                self.cognito_url, headers=headers, json=payload, timeout=30
+            rate_limiter.acquire(self.cognito_url)
+            response = self.session.post(
+                self.cognito_url, headers=headers, json=payload, timeout=self.timeout
             )
+        except requests.exceptions.RequestException as e:
+            circuit_breakers.record_failure(self.cognito_url)
+            raise UpstreamUnavailableError(f"Cognito request error: {str(e)}")
+        if is_upstream_failure_status(response.status_code):
+            circuit_breakers.record_failure(self.cognito_url)
+            raise UpstreamUnavailableError(
+                f"Cognito request failed: {response.status_code}"
+            )
+        circuit_breakers.record_success(self.cognito_url)
 
+        try:
             if response.status_code == 200:
-                token = response.json().get("AuthenticationResult", {}).get("IdToken")
-                if token:
-                    self.token_cache[(user_id, ircc_username)] = token
-                    return token
+                return self._parse_auth_result(json_codec.loads(response.content))
         except Exception as e:
             print(f"Error getting token: {str(e)}")
 
         return None
 
+    def _build_token_payload(self, ircc_username: str, ircc_password: str) -> dict:
+        """Build Cognito InitiateAuth payload"""
+        return {
+            "AuthFlow": "USER_PASSWORD_AUTH",
+            "ClientId": self.client_id,
+            "AuthParameters": {"USERNAME": ircc_username, "PASSWORD": ircc_password},
+            "ClientMetadata": {},
+        }
+
+    def _build_refresh_payload(self, refresh_token: str) -> dict:
+        """Build Cognito InitiateAuth payload for the refresh token flow"""
+        return {
+            "AuthFlow": "REFRESH_TOKEN_AUTH",
+            "ClientId": self.client_id,
+            "AuthParameters": {"REFRESH_TOKEN": refresh_token},
+        }
+
+    @staticmethod
+    def _parse_auth_result(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Extract AuthenticationResult from Cognito InitiateAuth response"""
+        return data.get("AuthenticationResult")
+
     def _make_api_request(self, token: str, method: str, **kwargs) -> Dict[str, Any]:
-        """Make API request with token"""
+        """Make API request with token, retrying transient upstream failures"""
+        if cassette.is_replaying:
+            return cassette.replay(self.application_type, method, kwargs)
+        response = retry_policy.call(self._send_api_request, token, method, **kwargs)
+        if cassette.is_recording:
+            cassette.record(self.application_type, method, kwargs, response)
+        return response
+
+    def _send_api_request(self, token: str, method: str, **kwargs) -> Dict[str, Any]:
+        """Send one API request"""
         headers = self._get_api_headers(token)
         payload = {"method": method, **kwargs}
 
+        circuit_breakers.before_request(self.base_url)
         try:
-            response = requests.post(
-                self.base_url, headers=headers, json=payload, timeout=30
+            rate_limiter.acquire(self.base_url)
+            response = self.session.post(
+                self.base_url, headers=headers, json=payload, timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            circuit_breakers.record_failure(self.base_url)
+            raise UpstreamUnavailableError(f"API request error: {str(e)}")
+        if is_upstream_failure_status(response.status_code):
+            circuit_breakers.record_failure(self.base_url)
+            raise UpstreamUnavailableError(
+                f"API request failed: {response.status_code} {response.text}"
             )
+        circuit_breakers.record_success(self.base_url)
 
+        try:
             if response.status_code == 200:
-                return response.json()
+                return json_codec.loads(response.content)
             raise Exception(
                 f"API request failed: {response.status_code} {response.text}"
             )
@@ -109,12 +240,11 @@ class IRCCAgent:
 
         @wraps(func)
         def wrapper(self, credential: IRCCCredential, *args, **kwargs):
-            salt = credential.salt
-            # Get token
+            # Get token, the password is decrypted only on a token store miss
             token = self._get_token(
                 credential.user_id,
                 credential.ircc_username,
-                encryption_manager.decrypt(salt, credential.encrypted_password),
+                self._password_provider(credential),
             )
 
             if not token:
@@ -125,18 +255,93 @@ class IRCCAgent:
 
         return wrapper
 
+    @staticmethod
+    def _password_provider(credential: IRCCCredential) -> SecretProvider:
+        """Get a provider that decrypts the credential's password when called"""
+        return lambda: encryption_manager.decrypt(
+            credential.salt, credential.encrypted_password
+        )
+
     def verify_ircc_credentials(
         self, user_id: str, ircc_username: str, ircc_password: str
     ) -> bool:
         """Verify IRCC credentials"""
-        if (user_id, ircc_username) in self.token_cache:
-            del self.token_cache[(user_id, ircc_username)]
-        token = self._get_token(user_id, ircc_username, ircc_password)
+        # Always log in with the given password, not a shared in-flight token request
+        key = (user_id, ircc_username)
+        self.token_store.pop(key)
+        try:
+            token = self._login(key, ircc_username, ircc_password)
+        except UpstreamUnavailableError as e:
+            # Cognito outage is not proof of bad credentials, callers save and warn
+            logger.warning(f"Could not verify IRCC credentials of {ircc_username}: {str(e)}")
+            return False
         if not token:
             return False
 
         return True
 
+    def refresh_expiring_tokens(self, max_workers: int = 4) -> int:
+        """Renew recently used tokens before they expire, returns count refreshed"""
+        now = datetime.now(timezone.utc)
+        used_since = now - timedelta(seconds=Config.TOKEN_REFRESH_IDLE_SECONDS)
+        expiring = self.token_store.get_expiring(
+            timedelta(seconds=Config.TOKEN_REFRESH_WINDOW_SECONDS), used_since
+        )
+        self.token_store.purge_expired(used_since)
+        if not expiring:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda item: self._token_flight.do(item[0], self._refresh_token, item[0]),
+                expiring,
+            )
+            refreshed = sum(1 for result in results if result)
+        logger.info(
+            f"Refreshed {refreshed}/{len(expiring)} expiring {self.application_type} tokens"
+        )
+        return refreshed
+
+    def _refresh_token(self, key: Tuple[str, str]) -> Optional[str]:
+        """Fetch a replacement token for a stored account, returns IdToken
+
+        Shares the single flight of _get_token, so it must return what
+        _acquire_token returns to callers that join it.
+        """
+        user_id, ircc_username = key
+        try:
+            # Refresh token flow needs no password decrypt
+            entry = self.token_store.get_entry(key)
+            if entry and entry.refresh_token:
+                token = self._renew_token(key, entry.refresh_token)
+                if token:
+                    return token
+
+            credential = next(
+                (
+                    credential
+                    for credential in IRCCCredential.find_by_user_id(user_id)
+                    if credential.ircc_username == ircc_username
+                    and credential.application_type == self.application_type
+                ),
+                None,
+            )
+            if credential is None:
+                # Credential was deleted or deactivated, stop refreshing it
+                self.token_store.pop(key)
+                return None
+
+            return self._login(
+                key,
+                ircc_username,
+                encryption_manager.decrypt(
+                    credential.salt, credential.encrypted_password
+                ),
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing token for user {user_id}: {str(e)}")
+            return None
+
     @with_token
     def get_application_summary(
         self, credential: IRCCCredential, token: Optional[str] = None
@@ -144,36 +349,85 @@ class IRCCAgent:
         """Get application summary"""
         raise NotImplementedError("This method is not implemented")
 
+    def get_application_details_response(
+        self, credential: IRCCCredential
+    ) -> Dict[str, Any]:
+        """Get raw get-application-details response"""
+        return self._details_flight.do(
+            (
+                credential.user_id,
+                credential.ircc_username,
+                credential.application_number,
+            ),
+            self._fetch_application_details_response,
+            credential,
+        )
+
     @with_token
-    def get_application_details(
+    def _fetch_application_details_response(
         self, credential: IRCCCredential, token: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Fetch get-application-details response"""
+        return self._make_api_request(
+            token,
+            "get-application-details",
+            **self._application_details_params(credential),
+        )
+
+    def get_application_details(self, credential: IRCCCredential) -> ApplicationRecord:
+        """Get application details"""
+        return self.parse_application_details(
+            credential, self.get_application_details_response(credential)
+        )
+
+    def _application_details_params(self, credential: IRCCCredential) -> dict:
+        """Build get-application-details request parameters"""
+        raise NotImplementedError("This method is not implemented")
+
+    def parse_application_details(
+        self, credential: IRCCCredential, response: Dict[str, Any]
     ) -> ApplicationRecord:
+        """Parse get-application-details response"""
         raise NotImplementedError("This method is not implemented")
 
 
 class IRCCAgentFactory:
     _instances = {}
+    _lock = threading.Lock()
 
     @classmethod
     def get_ircc_agent(cls, application_type: str) -> IRCCAgent:
         """Get IRCC agent singleton instance"""
-        if application_type not in cls._instances:
-            if application_type == "citizen":
-                cls._instances[application_type] = IRCCCitizenAgent()
-            elif application_type == "immigrant":
-                cls._instances[application_type] = IRCCImmigrantAgent()
-            else:
-                raise ValueError("Invalid application type")
-        return cls._instances[application_type]
+        with cls._lock:
+            if application_type not in cls._instances:
+                if application_type == "citizen":
+                    cls._instances[application_type] = IRCCCitizenAgent()
+                elif application_type == "immigrant":
+                    cls._instances[application_type] = IRCCImmigrantAgent()
+                else:
+                    raise ValueError("Invalid application type")
+            return cls._instances[application_type]
+
+    @classmethod
+    def refresh_expiring_tokens(cls) -> int:
+        """Refresh expiring tokens of all agents, returns count refreshed"""
+        with cls._lock:
+            agents = list(cls._instances.values())
+        return sum(
+            agent.refresh_expiring_tokens(Config.TOKEN_REFRESH_CONCURRENCY)
+            for agent in agents
+        )
 
 
 class IRCCCitizenAgent(IRCCAgent):
     """Citizen application specific agent implementation"""
 
+    application_type = "citizen"
+
     def __init__(self):
         super().__init__()
-        self.base_url = "https://api.tracker-suivi.apps.cic.gc.ca/user"
-        self.cognito_url = "https://cognito-idp.ca-central-1.amazonaws.com/"
+        self.base_url = Config.IRCC_CITIZEN_API_URL
+        self.cognito_url = Config.IRCC_COGNITO_URL
         self.client_id = "mtnf1qn9p739g2v8aij2anpju"
 
     @IRCCAgent.with_token
@@ -182,27 +436,33 @@ class IRCCCitizenAgent(IRCCAgent):
     ) -> list[ApplicationSummary]:
         """Get application summary"""
         response = self._make_api_request(token, "get-profile-summary", limit="500")
+        return self._parse_application_summary(response)
+
+    def _parse_application_summary(
+        self, response: Dict[str, Any]
+    ) -> list[ApplicationSummary]:
+        """Parse get-profile-summary response"""
         return [
             ApplicationSummary("citizen", app.get("appNumber"))
             for app in response.get("apps", [])
         ]
 
-    @IRCCAgent.with_token
-    def get_application_details(
-        self, credential: IRCCCredential, token: Optional[str] = None
+    def _application_details_params(self, credential: IRCCCredential) -> dict:
+        """Build get-application-details request parameters"""
+        return {"applicationNumber": credential.application_number}
+
+    def parse_application_details(
+        self, credential: IRCCCredential, response: Dict[str, Any]
     ) -> ApplicationRecord:
-        """Get application details"""
-        response = self._make_api_request(
-            token,
-            "get-application-details",
-            applicationNumber=credential.application_number,
-        )
+        """Parse get-application-details response"""
         return ApplicationRecord.from_dict(response)
 
 
 class IRCCImmigrantAgent(IRCCAgent):
     """Immigrant application specific agent implementation"""
 
+    application_type = "immigrant"
+
     history_map = {
         "28": "BIRTH_CERT",
         "29": "DIVORCE_CERT",
@@ -248,8 +508,8 @@ class IRCCImmigrantAgent(IRCCAgent):
 
     def __init__(self):
         super().__init__()
-        self.base_url = "https://api.ircc-tracker-suivi.apps.cic.gc.ca/user"
-        self.cognito_url = "https://cognito-idp.ca-central-1.amazonaws.com/"
+        self.base_url = Config.IRCC_IMMIGRANT_API_URL
+        self.cognito_url = Config.IRCC_COGNITO_URL
         self.client_id = "3cfutv5ffd1i622g1tn6vton5r"
 
     @IRCCAgent.with_token
@@ -258,24 +518,29 @@ class IRCCImmigrantAgent(IRCCAgent):
     ) -> list[ApplicationSummary]:
         """Get application summary"""
         response = self._make_api_request(token, "get-profile-summary", limit="500")
+        return self._parse_application_summary(response)
+
+    def _parse_application_summary(
+        self, response: Dict[str, Any]
+    ) -> list[ApplicationSummary]:
+        """Parse get-profile-summary response"""
         return [
             ApplicationSummary("immigrant", app.get("appNum"))
             for app in response.get("apps", [])
         ]
 
-    @IRCCAgent.with_token
-    def get_application_details(
-        self, credential: IRCCCredential, token: Optional[str] = None
-    ) -> ApplicationRecord:
-        """Get application details"""
-        response = self._make_api_request(
-            token,
-            "get-application-details",
-            applicationNumber=credential.application_number,
-            uci=credential.ircc_username,
-            isAgent=False,
-        )
+    def _application_details_params(self, credential: IRCCCredential) -> dict:
+        """Build get-application-details request parameters"""
+        return {
+            "applicationNumber": credential.application_number,
+            "uci": credential.ircc_username,
+            "isAgent": False,
+        }
 
+    def parse_application_details(
+        self, credential: IRCCCredential, response: Dict[str, Any]
+    ) -> ApplicationRecord:
+        """Parse get-application-details response"""
         relations = response.get("relations", [{}])[0]
 
         acitivites = [
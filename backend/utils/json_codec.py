@@ -0,0 +1,110 @@
+"""JSON encoding and decoding for upstream responses and API responses.
+
+Uses orjson when it is installed and the standard library otherwise. Both
+backends encode datetime, date, ObjectId, Enum, UUID, Decimal and dataclass
+values the same way, so routes and models can hand them over as they are.
+Naive datetimes, as returned by MongoDB, are encoded as UTC.
+"""
+
+import dataclasses
+import json
+import logging
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from bson import ObjectId
+from flask.json.provider import JSONProvider
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _default(value: Any) -> Any:
+    """Convert values neither backend encodes natively"""
+    if isinstance(value, (ObjectId, Decimal)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_default(value: Any) -> Any:
+    """Convert the values orjson encodes natively, then fall back to _default"""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        # MongoDB returns naive UTC datetimes, keep the offset for browsers
+        return value.replace(tzinfo=timezone.utc).isoformat()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    return _default(value)
+
+
+class JSONCodec:
+    ORJSON = "orjson"
+    STDLIB = "json"
+
+    def __init__(self, backend: str = "auto"):
+        if backend == "auto":
+            backend = self.ORJSON if orjson is not None else self.STDLIB
+        if backend not in (self.ORJSON, self.STDLIB):
+            raise ValueError(f"Invalid JSON codec: {backend}")
+        if backend == self.ORJSON and orjson is None:
+            logger.warning("orjson is not installed, falling back to the json module")
+            backend = self.STDLIB
+        self.backend = backend
+
+    @classmethod
+    def from_config(cls) -> "JSONCodec":
+        """Create codec from configuration"""
+        return cls(Config.JSON_CODEC)
+
+    def dumps(self, value: Any) -> bytes:
+        """Encode a value to UTF-8 JSON"""
+        if self.backend == self.ORJSON:
+            return orjson.dumps(
+                value, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
+            )
+        return json.dumps(
+            value, default=_stdlib_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode JSON, raises a ValueError subclass on invalid input"""
+        if self.backend == self.ORJSON:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class CodecJSONProvider(JSONProvider):
+    """Flask JSON provider backed by the global codec"""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return json_codec.dumps(obj).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return json_codec.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response without an intermediate str"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(json_codec.dumps(obj), mimetype=self.mimetype)
+
+
+# Global JSON codec instance
+json_codec = JSONCodec.from_config()
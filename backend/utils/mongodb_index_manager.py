@@ -28,6 +28,13 @@ class MongoDBIndexManager:
                 {
                     'name': 'is_active',
                     'keys': [('is_active', ASCENDING)]
+                },
+                {
+                    'name': 'is_active_next_check_at',
+                    'keys': [
+                        ('is_active', ASCENDING),
+                        ('next_check_at', ASCENDING)
+                    ]
                 }
             ],
             'application_records': [
@@ -52,6 +59,36 @@ class MongoDBIndexManager:
                     'keys': [('uci', ASCENDING)]
                 }
             ],
+            'check_runs': [
+                {
+                    'name': 'status_updated_at',
+                    'keys': [
+                        ('status', ASCENDING),
+                        ('updated_at', ASCENDING)
+                    ]
+                },
+                {
+                    # At most one full check run is in progress
+                    'name': 'single_running_run',
+                    'keys': [('status', ASCENDING)],
+                    'unique': True,
+                    'partial_filter': {'status': 'running'}
+                }
+            ],
+            'ircc_tokens': [
+                {
+                    'name': 'purge_at_ttl',
+                    'keys': [('purge_at', ASCENDING)],
+                    'expire_after_seconds': 0
+                },
+                {
+                    'name': 'namespace_expires_at',
+                    'keys': [
+                        ('namespace', ASCENDING),
+                        ('expires_at', ASCENDING)
+                    ]
+                }
+            ],
             'users': [
                 {
                     'name': 'email',
@@ -97,11 +134,17 @@ class MongoDBIndexManager:
             index_name = index_def['name']
             if index_name not in existing_index_names:
                 try:
+                    options = {}
+                    if 'expire_after_seconds' in index_def:
+                        options['expireAfterSeconds'] = index_def['expire_after_seconds']
+                    if 'partial_filter' in index_def:
+                        options['partialFilterExpression'] = index_def['partial_filter']
                     collection.create_index(
                         index_def['keys'],
                         name=index_name,
                         unique=index_def.get('unique', False),
-                        background=True
+                        background=True,
+                        **options
                     )
                     created_indexes.append(index_name)
                 except Exception as e:
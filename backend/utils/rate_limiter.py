@@ -0,0 +1,107 @@
+"""Process-wide token-bucket rate limiting for upstream IRCC and Cognito hosts."""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import Config
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait for it"""
+        if self.rate <= 0:
+            return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            # Tokens may go negative, queued callers are spaced out by 1/rate
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Block until a token is available"""
+        wait_seconds = self._reserve()
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    async def acquire_async(self):
+        """Wait on the event loop until a token is available"""
+        wait_seconds = self._reserve()
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        default_rate: float,
+        default_burst: int,
+        host_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+    ):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.host_limits = host_limits or {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "RateLimiter":
+        """Create rate limiter from Config"""
+        return cls(
+            Config.UPSTREAM_RATE_LIMIT_PER_SECOND,
+            Config.UPSTREAM_RATE_LIMIT_BURST,
+            cls.parse_host_limits(Config.UPSTREAM_RATE_LIMITS),
+        )
+
+    @staticmethod
+    def parse_host_limits(value: str) -> Dict[str, Tuple[float, int]]:
+        """Parse 'host=rate:burst,host=rate:burst' overrides"""
+        host_limits = {}
+        for item in filter(None, (part.strip() for part in value.split(","))):
+            host, limit = item.split("=", 1)
+            rate, _, burst = limit.partition(":")
+            host_limits[host.strip().lower()] = (
+                float(rate),
+                int(burst) if burst else max(int(float(rate)), 1),
+            )
+        return host_limits
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        """Get token bucket shared by every request to the URL's host"""
+        host = (urlparse(url).hostname or url).lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_limits.get(
+                    host, (self.default_rate, self.default_burst)
+                )
+                bucket = self.buckets[host] = TokenBucket(rate, burst)
+            return bucket
+
+    def acquire(self, url: str):
+        """Block until a request to url is allowed"""
+        self.get_bucket(url).acquire()
+
+    async def acquire_async(self, url: str):
+        """Wait until a request to url is allowed"""
+        await self.get_bucket(url).acquire_async()
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter.from_config()
@@ -0,0 +1,127 @@
+"""Retries with exponential backoff, full jitter and a process-wide retry budget."""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from config import Config
+from utils.circuit_breaker import CircuitOpenError, UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """Allow retries up to a ratio of requests, so retries cannot become a storm.
+
+    Every request deposits ratio tokens and every retry spends one. A small
+    allowance of min_per_second keeps retries possible at low traffic, and
+    the balance is capped so a long healthy period cannot fund a burst.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_balance: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self.balance = max_balance
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.balance = min(
+            self.max_balance,
+            self.balance + (now - self.updated_at) * self.min_per_second,
+        )
+        self.updated_at = now
+
+    def record_request(self):
+        """Deposit the retry allowance of one request"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget, returns False if exhausted"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class RetryPolicy:
+    """Retry transient upstream failures, never requests rejected by an open circuit"""
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        budget: RetryBudget,
+    ):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    @classmethod
+    def from_config(cls) -> "RetryPolicy":
+        """Create retry policy from configuration"""
+        return cls(
+            Config.RETRY_MAX_ATTEMPTS,
+            Config.RETRY_BASE_DELAY_SECONDS,
+            Config.RETRY_MAX_DELAY_SECONDS,
+            RetryBudget(Config.RETRY_BUDGET_RATIO, Config.RETRY_BUDGET_MIN_PER_SECOND),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Get delay before the retry following attempt, with full jitter"""
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if not isinstance(error, UpstreamUnavailableError) or isinstance(
+            error, CircuitOpenError
+        ):
+            return False
+        return attempt < self.max_attempts and self.budget.try_spend()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call func, retrying transient upstream failures"""
+        self.budget.record_request()
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = self.backoff(attempt)
+                logger.info(f"Retrying after {delay:.2f}s (attempt {attempt}): {str(e)}")
+                attempt += 1
+                time.sleep(delay)
+
+    async def call_async(
+        self, func: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        """Await func, retrying transient upstream failures"""
+        self.budget.record_request()
+        attempt = 1
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = self.backoff(attempt)
+                logger.info(f"Retrying after {delay:.2f}s (attempt {attempt}): {str(e)}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+
+# Global retry policy for upstream requests
+retry_policy = RetryPolicy.from_config()
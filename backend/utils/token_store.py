@@ -0,0 +1,313 @@
+"""Expiry-aware stores for Cognito tokens of IRCC accounts.
+
+TokenStore keeps tokens in process memory. MongoTokenStore shares them between
+all web and checker processes, encrypted at rest, so they survive restarts.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, Optional
+
+import jwt
+from cryptography.fernet import InvalidToken
+from pymongo import ReturnDocument
+
+from config import Config
+from models.database import db_instance
+from utils.encryption import encryption_manager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TokenEntry:
+    id_token: str
+    expires_at: datetime
+    refresh_token: Optional[str] = None
+    last_used_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def is_fresh(self, now: datetime, margin: timedelta) -> bool:
+        """Check if token stays valid for at least margin"""
+        return self.expires_at - margin > now
+
+
+def get_token_expiry(id_token: str, default_ttl: timedelta) -> datetime:
+    """Read the exp claim of a Cognito token, fall back to default_ttl from now
+
+    The signature is not verified, the token is only passed back to IRCC which
+    does its own validation.
+    """
+    try:
+        claims = jwt.decode(id_token, options={"verify_signature": False})
+        return datetime.fromtimestamp(int(claims["exp"]), timezone.utc)
+    except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+        return datetime.now(timezone.utc) + default_ttl
+
+
+class TokenStore:
+    """Tokens keyed by account, valid until shortly before their real expiry.
+
+    There is no size cap: each entry is a few KB and expired entries are purged
+    by the background refresher.
+    """
+
+    # Calls never wait on I/O, async callers may use them on the event loop
+    blocking = False
+
+    def __init__(self, expiry_margin: timedelta, default_ttl: timedelta):
+        self.expiry_margin = expiry_margin
+        self.default_ttl = default_ttl
+        self._entries: Dict[Hashable, TokenEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Get a token that is not about to expire"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.is_fresh(now, self.expiry_margin):
+                return None
+            entry.last_used_at = now
+            return entry.id_token
+
+    def get_entry(self, key: Hashable) -> Optional[TokenEntry]:
+        """Get stored entry even if expired"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(
+        self, key: Hashable, id_token: str, refresh_token: Optional[str] = None
+    ) -> TokenEntry:
+        """Store token, keeping last use time of the entry it replaces"""
+        entry = TokenEntry(
+            id_token=id_token,
+            expires_at=get_token_expiry(id_token, self.default_ttl),
+            refresh_token=refresh_token,
+        )
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                entry.last_used_at = previous.last_used_at
+                entry.refresh_token = refresh_token or previous.refresh_token
+            self._entries[key] = entry
+        return entry
+
+    def pop(self, key: Hashable) -> Optional[TokenEntry]:
+        """Remove token"""
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def get_expiring(
+        self, within: timedelta, used_since: datetime
+    ) -> list[tuple[Hashable, TokenEntry]]:
+        """Get entries expiring within the window that were used recently"""
+        deadline = datetime.now(timezone.utc) + within
+        with self._lock:
+            return [
+                (key, entry)
+                for key, entry in self._entries.items()
+                if entry.expires_at <= deadline and entry.last_used_at >= used_since
+            ]
+
+    def purge_expired(self, idle_since: datetime) -> int:
+        """Drop expired entries not used since idle_since, returns count removed"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            expired = [
+                key
+                for key, entry in self._entries.items()
+                if entry.expires_at <= now and entry.last_used_at < idle_since
+            ]
+            for key in expired:
+                del self._entries[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class MongoTokenStore:
+    """Tokens shared through MongoDB, same interface as TokenStore.
+
+    Token values are encrypted with a key derived once from ENCRYPTION_KEY.
+    A TTL index drops entries retention after their last use.
+    """
+
+    collection_name = "ircc_tokens"
+    # Every call is a MongoDB round trip, async callers run them in threads
+    blocking = True
+    # Avoid a write on every read, last use only matters at minute precision
+    touch_interval = timedelta(seconds=60)
+    # How long a process may spend refreshing a token before others retry it
+    refresh_claim = timedelta(seconds=60)
+
+    def __init__(
+        self,
+        namespace: str,
+        expiry_margin: timedelta,
+        default_ttl: timedelta,
+        retention: timedelta,
+    ):
+        self.namespace = namespace
+        self.expiry_margin = expiry_margin
+        self.default_ttl = default_ttl
+        self.retention = retention
+        self.cipher = encryption_manager.get_context_cipher(self.collection_name)
+
+    def _collection(self):
+        return db_instance.get_collection(self.collection_name)
+
+    def _doc_id(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return "|".join([self.namespace, *(str(part) for part in parts)])
+
+    def _encrypt(self, value: str) -> str:
+        return self.cipher.encrypt(value.encode("utf-8")).decode("utf-8")
+
+    def _to_entry(self, doc: Optional[Dict[str, Any]]) -> Optional[TokenEntry]:
+        """Decrypt a stored document, unreadable entries count as missing"""
+        if not doc:
+            return None
+        try:
+            refresh_token = doc.get("refresh_token")
+            entry = TokenEntry(
+                id_token=self.cipher.decrypt(doc["id_token"].encode("utf-8")).decode(
+                    "utf-8"
+                ),
+                expires_at=doc["expires_at"],
+                refresh_token=(
+                    self.cipher.decrypt(refresh_token.encode("utf-8")).decode("utf-8")
+                    if refresh_token
+                    else None
+                ),
+                last_used_at=doc["last_used_at"],
+            )
+        except (InvalidToken, KeyError) as e:
+            logger.warning(f"Ignoring unreadable stored token {doc.get('_id')}: {e!r}")
+            return None
+
+        # MongoDB returns naive UTC datetimes
+        if entry.expires_at.tzinfo is None:
+            entry.expires_at = entry.expires_at.replace(tzinfo=timezone.utc)
+        if entry.last_used_at.tzinfo is None:
+            entry.last_used_at = entry.last_used_at.replace(tzinfo=timezone.utc)
+        return entry
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Get a token that is not about to expire"""
+        now = datetime.now(timezone.utc)
+        entry = self.get_entry(key)
+        if entry is None or not entry.is_fresh(now, self.expiry_margin):
+            return None
+        if now - entry.last_used_at >= self.touch_interval:
+            self._collection().update_one(
+                {"_id": self._doc_id(key)},
+                {"$set": {"last_used_at": now, "purge_at": now + self.retention}},
+            )
+        return entry.id_token
+
+    def get_entry(self, key: Hashable) -> Optional[TokenEntry]:
+        """Get stored entry even if expired"""
+        return self._to_entry(self._collection().find_one({"_id": self._doc_id(key)}))
+
+    def put(
+        self, key: Hashable, id_token: str, refresh_token: Optional[str] = None
+    ) -> TokenEntry:
+        """Store token, keeping last use time of the entry it replaces"""
+        now = datetime.now(timezone.utc)
+        update = {
+            "$set": {
+                "id_token": self._encrypt(id_token),
+                "expires_at": get_token_expiry(id_token, self.default_ttl),
+                "refresh_claimed_until": None,
+            },
+            "$setOnInsert": {
+                "namespace": self.namespace,
+                "key": list(key) if isinstance(key, tuple) else [key],
+                "last_used_at": now,
+                "purge_at": now + self.retention,
+            },
+        }
+        if refresh_token:
+            update["$set"]["refresh_token"] = self._encrypt(refresh_token)
+
+        doc = self._collection().find_one_and_update(
+            {"_id": self._doc_id(key)},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._to_entry(doc)
+
+    def pop(self, key: Hashable) -> Optional[TokenEntry]:
+        """Remove token"""
+        return self._to_entry(
+            self._collection().find_one_and_delete({"_id": self._doc_id(key)})
+        )
+
+    def get_expiring(
+        self, within: timedelta, used_since: datetime
+    ) -> list[tuple[Hashable, TokenEntry]]:
+        """Claim entries expiring within the window that were used recently
+
+        Each entry is claimed for refresh_claim, so only one process refreshes it.
+        """
+        now = datetime.now(timezone.utc)
+        collection = self._collection()
+        candidates = collection.find(
+            {
+                "namespace": self.namespace,
+                "expires_at": {"$lte": now + within},
+                "last_used_at": {"$gte": used_since},
+            }
+        )
+
+        expiring = []
+        for doc in candidates:
+            claimed = collection.update_one(
+                {
+                    "_id": doc["_id"],
+                    "$or": [
+                        {"refresh_claimed_until": None},
+                        {"refresh_claimed_until": {"$lte": now}},
+                    ],
+                },
+                {"$set": {"refresh_claimed_until": now + self.refresh_claim}},
+            )
+            entry = self._to_entry(doc)
+            if claimed.modified_count and entry is not None:
+                expiring.append((tuple(doc["key"]), entry))
+        return expiring
+
+    def purge_expired(self, idle_since: datetime) -> int:
+        """Expired entries are removed by the TTL index"""
+        return 0
+
+    def __len__(self) -> int:
+        return self._collection().count_documents({"namespace": self.namespace})
+
+
+def create_token_store(namespace: str):
+    """Create token store for the configured backend"""
+    expiry_margin = timedelta(seconds=Config.TOKEN_EXPIRY_MARGIN_SECONDS)
+    # Cognito IdTokens last an hour, assume 50 minutes if the exp claim is unreadable
+    default_ttl = timedelta(seconds=3000)
+
+    backend = Config.TOKEN_STORE_BACKEND
+    if Config.IRCC_CASSETTE_MODE == "replay" and backend != "memory":
+        # Replayed tokens are fake, never share them with processes talking to IRCC
+        logger.warning("IRCC_CASSETTE_MODE is replay, using the in-memory token store")
+        backend = "memory"
+    if backend == "mongo":
+        return MongoTokenStore(
+            namespace,
+            expiry_margin,
+            default_ttl,
+            retention=timedelta(seconds=Config.TOKEN_STORE_RETENTION_SECONDS),
+        )
+    if backend == "memory":
+        return TokenStore(expiry_margin, default_ttl)
+    raise ValueError(f"Invalid token store backend: {backend}")
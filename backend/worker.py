@@ -0,0 +1,50 @@
+"""Standalone IRCC checker process without the web server.
+
+Several workers can run on one or more nodes; credentials are leased in
+MongoDB so each one is checked by a single worker at a time.
+"""
+
+from models.database import db_instance
+from services.scheduler import TaskScheduler
+from utils.mongodb_index_manager import init_mongodb_indexes
+import logging
+import signal
+import threading
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s",
+    handlers=[logging.FileHandler("ircc_worker.log"), logging.StreamHandler()],
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main function"""
+    logger.info("IRCC checker worker starting...")
+
+    if not db_instance.connect():
+        logger.error("Database connection failed. Exiting...")
+        return
+    init_mongodb_indexes(db_instance)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    # Workers share the fleet through credential leases instead of leader election
+    task_scheduler = TaskScheduler(use_leader_election=False)
+    try:
+        task_scheduler.start()
+        stop_event.wait()
+    except KeyboardInterrupt:
+        logger.info("Worker shutdown requested by user")
+    finally:
+        task_scheduler.stop()
+        db_instance.close()
+        logger.info("Worker cleanup completed")
+
+
+if __name__ == "__main__":
+    main()